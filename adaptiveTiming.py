@@ -0,0 +1,85 @@
+import threading
+
+"""
+RTT-adaptive probe timeouts, similar to Nmap's timing engine
+Every real reply (a completed connect or an RST) is an RTT sample for its
+host. Per host we keep a smoothed RTT and variance (RFC 6298) and derive
+the probe timeout from them, so LAN hosts do not wait seconds per filtered
+port and slow WAN links still get enough time. Like Nmap, every host
+starts with a retransmission allowance, raised when only a retry gets an
+answer and lowered once a host keeps answering first probes without any.
+"""
+
+
+# first probe replies in a row before a host's retry allowance drops by one
+CLEAN_REPLIES = 100
+
+
+class HostTiming:
+    __slots__ = ("srtt", "rttvar", "retries", "clean")
+
+    def __init__(self, retries):
+        self.srtt = None  # seconds
+        self.rttvar = None
+        self.retries = retries
+        self.clean = 0  # first probe replies since the last retransmission
+
+
+class AdaptiveTiming:
+    """Per-host timeouts and retransmission limits from observed RTTs"""
+
+    def __init__(
+        self,
+        initial_timeout=1.0,
+        min_timeout=0.1,
+        max_timeout=10.0,
+        max_retries=2,
+        initial_retries=1,
+    ):
+        self.min_timeout = min_timeout
+        self.max_timeout = max(min_timeout, max_timeout)
+        self.initial_timeout = self.clamp(initial_timeout)
+        self.max_retries = max_retries
+        self.initial_retries = min(initial_retries, max_retries)
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def clamp(self, timeout):
+        return min(self.max_timeout, max(self.min_timeout, timeout))
+
+    def _host(self, host):
+        timing = self.hosts.get(host)
+        if timing is None:
+            timing = self.hosts[host] = HostTiming(self.initial_retries)
+        return timing
+
+    def timeout(self, host):
+        timing = self.hosts.get(host)
+        if timing is None or timing.srtt is None:
+            return self.initial_timeout
+        return self.clamp(timing.srtt + 4 * timing.rttvar)
+
+    def retries(self, host):
+        timing = self.hosts.get(host)
+        return timing.retries if timing else self.initial_retries
+
+    def record(self, host, rtt, retransmitted=False):
+        # a reply came back after rtt seconds
+        with self.lock:
+            timing = self._host(host)
+            if timing.srtt is None:
+                timing.srtt = rtt
+                timing.rttvar = rtt / 2
+            else:
+                timing.rttvar = 0.75 * timing.rttvar + 0.25 * abs(timing.srtt - rtt)
+                timing.srtt = 0.875 * timing.srtt + 0.125 * rtt
+            if retransmitted:
+                # only the retry got an answer, this host drops probes
+                timing.retries = min(self.max_retries, timing.retries + 1)
+                timing.clean = 0
+            else:
+                timing.clean += 1
+                if timing.clean >= CLEAN_REPLIES and timing.retries:
+                    # reliable host, stop paying for retries on filtered ports
+                    timing.retries -= 1
+                    timing.clean = 0
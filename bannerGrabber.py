@@ -0,0 +1,237 @@
+import asyncio
+import concurrent.futures
+import re
+import ssl
+import threading
+from scanScheduler import is_ip_address
+
+"""
+Banner grabbing / service fingerprinting
+Optional stage behind the port scan: every OPEN port gets one more short
+connection. First a passive read (SSH, FTP, SMTP, POP3, IMAP and MySQL
+speak first), then protocol probes for services that wait for the client:
+an SMTP EHLO for bare "220" greetings, an HTTP request, and a TLS handshake
+(with an HTTP request inside) when plain text gets nothing. Replies are
+matched against SIGNATURES for a real service name and version.
+The stage runs on its own thread and event loop with its own concurrency
+cap, every read has a byte and time budget, so it never holds up the scan.
+"""
+
+# (service, pattern, version pattern), first match wins. The version is
+# the "version" group of pattern, or group 1 of the version pattern
+SIGNATURES = [
+    (name, re.compile(pattern, flags), version and re.compile(version, re.I))
+    for name, pattern, flags, version in [
+        ("SSH", rb"^SSH-[\d.]+-(?P<version>[^\s]+)", 0, None),
+        ("FTP", rb"^220[ -](?P<version>[^\r\n]*FTP[^\r\n]*)", re.I, None),
+        ("SMTP", rb"^220[ -](?P<version>[^\r\n]*SMTP[^\r\n]*)", re.I, None),
+        ("SMTP", rb"^250[ -](?P<version>[^\r\n]*)", 0, None),
+        ("POP3", rb"^\+OK ?(?P<version>[^\r\n]*)", 0, None),
+        ("IMAP", rb"^\* OK ?(?P<version>[^\r\n]*)", 0, None),
+        ("MySQL", rb"^.{4}\x0a(?P<version>[\w.-]+)\x00", re.S, None),
+        ("HTTP", rb"^HTTP/\d(?:\.\d)? \d{3}", 0, rb"\r\nServer:[ \t]*([^\r\n]+)"),
+    ]
+]
+
+# ports where the client starts with a TLS handshake
+TLS_PORTS = {443, 465, 636, 853, 993, 995, 8443}
+
+HTTP_PROBE = b"HEAD / HTTP/1.0\r\nUser-Agent: PortScanner\r\n\r\n"
+SMTP_PROBE = b"EHLO portscanner\r\n"
+
+
+def match_banner(data):
+    # (service, version) for the first matching signature, or None
+    for name, pattern, version_pattern in SIGNATURES:
+        match = pattern.search(data)
+        if not match:
+            continue
+        version = None
+        if version_pattern:
+            found = version_pattern.search(data)
+            version = found and found.group(1)
+        elif "version" in pattern.groupindex:
+            version = match.group("version")
+        if version:
+            version = version.decode("latin-1").strip()[:80]
+        return name, version or None
+    return None
+
+
+def tls_context():
+    # fingerprinting only, any certificate and old protocol versions are fine
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.set_alpn_protocols(["http/1.1"])
+    return context
+
+
+class BannerGrabber:
+    """Fingerprints OPEN results on a background event loop"""
+
+    def __init__(
+        self,
+        callback=None,
+        concurrency=32,
+        connect_timeout=2.0,
+        read_timeout=1.5,
+        max_bytes=2048,
+    ):
+        # callback(result) gets every submitted result once it is done,
+        # with "service" replaced when a signature matched
+        self.callback = callback
+        self.concurrency = concurrency
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_bytes = max_bytes
+        self.tls = tls_context()
+        self.loop = None
+        self.thread = None
+        self.semaphore = None
+        self.futures = set()
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self
+
+    def submit(self, result, address=None):
+        # thread safe, called from the scan for every OPEN result, address
+        # saves resolving result["host"] again
+        future = asyncio.run_coroutine_threadsafe(
+            self.process(result, address), self.loop
+        )
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self.lock:
+            self.futures.discard(future)
+
+    def close(self, cancel=False):
+        # waits for outstanding fingerprints (bounded by the time budgets)
+        if cancel:
+            asyncio.run_coroutine_threadsafe(self._cancel(), self.loop).result()
+        with self.lock:
+            futures = list(self.futures)
+        concurrent.futures.wait(futures)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    async def _cancel(self):
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def process(self, result, address=None):
+        found = None
+        host = result["host"]
+        try:
+            async with self.semaphore:
+                found = await self.fingerprint(address or host, result["port"], host)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            # cancelled results are reported too, with the service unchanged
+            if found:
+                name, version = found
+                service = f"{name} {version}" if version else name
+                result = dict(result, service=service)
+            if self.callback:
+                self.callback(result)
+        return result
+
+    async def fingerprint(self, host, port, name=None):
+        # (service, version) or None, name is the hostname for TLS SNI
+        if port in TLS_PORTS:
+            return await self.probe_tls(host, port, name)
+
+        reader, writer = await self.connect(host, port)
+        try:
+            data = await self.read(reader)
+            if data.startswith(b"220") and not match_banner(data):
+                # bare greeting, an SMTP server answers EHLO with 250
+                data = await self.exchange(reader, writer, SMTP_PROBE)
+            elif not data:
+                data = await self.exchange(reader, writer, HTTP_PROBE)
+        finally:
+            writer.close()
+
+        if data:
+            return match_banner(data)
+        # silent in plain text, maybe TLS on an unusual port
+        return await self.probe_tls(host, port, name)
+
+    async def probe_tls(self, host, port, name=None):
+        name = name or host
+        server_name = None if is_ip_address(name) else name
+        reader, writer = await self.connect(host, port, self.tls, server_name)
+        try:
+            ssl_object = writer.get_extra_info("ssl_object")
+            tls_version = ssl_object.version() if ssl_object else None
+            # SMTPS, IMAPS, POP3S greet first, HTTPS waits for a request
+            data = await self.read(reader)
+            if not data:
+                data = await self.exchange(reader, writer, HTTP_PROBE)
+        finally:
+            writer.close()
+        found = match_banner(data) if data else None
+        if found and found[0] == "HTTP":
+            return "HTTPS", found[1]
+        if found:
+            return found[0] + "S", found[1]
+        return "TLS", tls_version
+
+    async def connect(self, host, port, tls=None, server_name=None):
+        return await asyncio.wait_for(
+            asyncio.open_connection(
+                host, port, ssl=tls, server_hostname=server_name if tls else None
+            ),
+            self.connect_timeout,
+        )
+
+    async def exchange(self, reader, writer, probe):
+        writer.write(probe)
+        await writer.drain()
+        return await self.read(reader)
+
+    async def read(self, reader):
+        # up to max_bytes, whatever arrives within read_timeout
+        data = b""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.read_timeout
+        while len(data) < self.max_bytes:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                chunk = await asyncio.wait_for(
+                    reader.read(self.max_bytes - len(data)), remaining
+                )
+            except (asyncio.TimeoutError, ConnectionError):
+                break
+            if not chunk:
+                break
+            data += chunk
+            # a complete greeting line or HTTP head is enough
+            if data.startswith(b"HTTP"):
+                if b"\r\n\r\n" in data:
+                    break
+            elif b"\n" in data:
+                break
+        return data
@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+"""
+Scan engine benchmark against a local loopback target farm
+The farm (targetFarm.py) runs in this process, every engine runs in a
+fresh interpreter so memory and descriptor numbers are its own. Reports
+ports/sec, p50/p99 round trip latency, peak RSS, peak open descriptors and how
+many ports were classified differently from the farm's ground truth.
+
+  python benchmarks/scan.py
+  python benchmarks/scan.py --engines async threads --json before.json
+  python benchmarks/scan.py --json after.json --compare before.json
+  python benchmarks/scan.py --delay OPEN=0.02
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from portScanner import ENGINES  # noqa: E402
+from targetFarm import TargetFarm  # noqa: E402
+
+# engines scored against the farm's UDP ports instead of its TCP ports
+UDP_ENGINES = ("udp",)
+
+
+def open_fds(pids):
+    count = 0
+    for pid in pids:
+        try:
+            count += len(os.listdir(f"/proc/{pid}/fd"))
+        except OSError:
+            pass
+    return count
+
+
+def child_pids():
+    # direct children (process engine shards), Linux only
+    pids = []
+    try:
+        for tid in os.listdir("/proc/self/task"):
+            with open(f"/proc/self/task/{tid}/children") as f:
+                pids.extend(f.read().split())
+    except OSError:
+        pass
+    return pids
+
+
+class FdSampler:
+    """Peak descriptor count of this process and its children"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.peak = max(self.peak, open_fds(["self"] + child_pids()))
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def child(config):
+    # runs in a fresh interpreter, prints one JSON line of measurements
+    import resource
+    from portScanner import PortScanner
+    from scanResults import PortStatus
+    from scanScheduler import ScanScheduler
+
+    scanner = PortScanner(
+        config["timeout"],
+        engine=config["engine"],
+        concurrency=config["concurrency"],
+    )
+    scheduler = ScanScheduler(config["targets"], config["ports"])
+    baseline_fds = open_fds(["self"])
+
+    start = time.perf_counter()
+    with FdSampler() as sampler:
+        results = scanner.scan_targets(scheduler)
+    elapsed = time.perf_counter() - start
+
+    # round trips only (open or closed, like the metrics RTT histogram),
+    # NaN = no latency recorded for that row
+    latencies = [
+        latency
+        for latency, status in (
+            (results.latency(row), results.status(row)) for row in range(len(results))
+        )
+        if latency == latency and status in (PortStatus.OPEN, PortStatus.CLOSED)
+    ]
+    statuses = [
+        [results.host(row), results.port(row), results.status(row).name]
+        for row in range(len(results))
+    ]
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(
+        json.dumps(
+            {
+                "probes": len(results),
+                "seconds": elapsed,
+                "ports_per_sec": len(results) / elapsed if elapsed else 0.0,
+                "latency_p50_ms": percentile(latencies, 0.50),
+                "latency_p99_ms": percentile(latencies, 0.99),
+                # ru_maxrss is KiB on Linux
+                "peak_rss_mb": self_rss / 1024,
+                "peak_child_rss_mb": children_rss / 1024,
+                "peak_fds": max(sampler.peak, baseline_fds),
+                "statuses": statuses,
+            }
+        )
+    )
+
+
+def run_engine(engine, farm, args):
+    proto = "udp" if engine in UDP_ENGINES else "tcp"
+    ports = farm.udp_ports if proto == "udp" else farm.tcp_ports
+    config = {
+        "engine": engine,
+        "targets": farm.addresses,
+        "ports": ports,
+        "timeout": args.timeout,
+        "concurrency": args.concurrency,
+    }
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", json.dumps(config)],
+        capture_output=True,
+        text=True,
+    )
+    if output.returncode != 0:
+        error = output.stderr.strip().splitlines()
+        return {"skipped": error[-1] if error else f"exit {output.returncode}"}
+
+    report = json.loads(output.stdout.strip().splitlines()[-1])
+    statuses = report.pop("statuses")
+    mismatches = 0
+    for host, port, status in statuses:
+        expected = farm.expected.get((proto, host, port))
+        if expected is not None and expected != status:
+            mismatches += 1
+    report["mismatches"] = mismatches
+    return report
+
+
+def git_commit():
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    return output.stdout.strip() or None
+
+
+def print_report(report, baseline=None):
+    if baseline and baseline.get("farm") != report["farm"]:
+        print("note: baseline was run with a different farm / settings")
+    columns = ("ports/s", "p50 ms", "p99 ms", "RSS MB", "fds", "wrong")
+    print(f"{'engine':<12}" + "".join(f"{c:>10}" for c in columns))
+    for engine, stats in report["engines"].items():
+        if "skipped" in stats:
+            print(f"{engine:<12}  skipped: {stats['skipped']}")
+            continue
+        rss = max(stats["peak_rss_mb"], stats["peak_child_rss_mb"])
+        values = (
+            f"{stats['ports_per_sec']:.0f}",
+            format_ms(stats["latency_p50_ms"]),
+            format_ms(stats["latency_p99_ms"]),
+            f"{rss:.1f}",
+            str(stats["peak_fds"]),
+            str(stats["mismatches"]),
+        )
+        print(f"{engine:<12}" + "".join(f"{v:>10}" for v in values))
+
+        old = (baseline or {}).get("engines", {}).get(engine)
+        if old and "skipped" not in old:
+            change = stats["ports_per_sec"] / old["ports_per_sec"] - 1
+            print(f"{'':<12}{change:>+9.1%} ports/s vs {baseline.get('commit')}")
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan engine benchmark")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--ports", type=int, default=2000, help="TCP ports per host")
+    parser.add_argument(
+        "--udp-ports",
+        type=int,
+        default=100,
+        help="UDP ports per host, the UDP engine starts at ~50 probes/s per host",
+    )
+    parser.add_argument("--open-ratio", type=float, default=0.1)
+    parser.add_argument("--filtered-ratio", type=float, default=0.02)
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=0.5,
+        help="probe timeout, what every filtered port costs",
+    )
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument(
+        "--delay",
+        action="append",
+        default=[],
+        metavar="ROLE=SECONDS",
+        help="farm ports of ROLE accept / answer that late, e.g. OPEN=0.02",
+    )
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare with")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(json.loads(args.child))
+        return 0
+
+    delays = {}
+    for delay in args.delay:
+        role, _, seconds = delay.partition("=")
+        try:
+            delays[role.upper()] = float(seconds)
+        except ValueError:
+            parser.error(f"--delay expects ROLE=SECONDS, got {delay!r}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    try:
+        farm = TargetFarm(
+            hosts=args.hosts,
+            ports=args.ports,
+            udp_ports=args.udp_ports,
+            open_ratio=args.open_ratio,
+            filtered_ratio=args.filtered_ratio,
+            delays=delays,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    report = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "farm": {
+            "hosts": args.hosts,
+            "tcp_ports": args.ports,
+            "udp_ports": args.udp_ports,
+            "open_ratio": args.open_ratio,
+            "filtered_ratio": args.filtered_ratio,
+            "timeout": args.timeout,
+            "concurrency": args.concurrency,
+            "delays": delays,
+        },
+        "engines": {},
+    }
+    with farm:
+        for engine in args.engines:
+            report["engines"][engine] = run_engine(engine, farm, args)
+
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
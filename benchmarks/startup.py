@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+"""
+GUI startup benchmark
+Every run is a fresh interpreter (cold imports), timed in phases:
+  imports     - import main (PySide6, components, styles)
+  construct   - QApplication, stylesheet and main window construction
+  first_paint - window.show() until the window receives its first paint
+  total       - interpreter start until first paint
+and the heaviest modules from python -X importtime.
+
+  python benchmarks/startup.py --runs 10
+  python benchmarks/startup.py --offscreen --json startup.json
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child():
+    # runs inside the fresh interpreter, prints one JSON line of timings
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import main
+    from PySide6.QtCore import QEvent, QObject, QTimer
+
+    imported = time.perf_counter()
+    app, window = main.create_app([sys.argv[0]])
+    constructed = time.perf_counter()
+    painted = []
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and not painted:
+                painted.append(time.perf_counter())
+                QTimer.singleShot(0, app.quit)
+            return False
+
+    watcher = PaintWatcher()
+    window.installEventFilter(watcher)
+    window.show()
+    QTimer.singleShot(10000, app.quit)  # never hang on a headless box
+    app.exec()
+
+    if not painted:
+        raise SystemExit("window was never painted")
+    print(
+        json.dumps(
+            {
+                "imports": imported - start,
+                "construct": constructed - imported,
+                "first_paint": painted[0] - constructed,
+                "total": painted[0] - start,
+            }
+        )
+    )
+
+
+def run_child(env):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def heaviest_imports(env, count):
+    # (cumulative us, module) for top level imports of main
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # one level of indent = imported directly by main
+        if name.startswith("   ") and not name.startswith("    "):
+            modules.append((int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GUI startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--offscreen", action="store_true", help="use the offscreen Qt platform"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return 0
+
+    env = dict(os.environ)
+    if args.offscreen or not (env.get("DISPLAY") or env.get("WAYLAND_DISPLAY")):
+        env["QT_QPA_PLATFORM"] = "offscreen"
+
+    runs = [run_child(env) for _ in range(args.runs)]
+    phases = ("imports", "construct", "first_paint", "total")
+    report = {
+        "python": sys.version.split()[0],
+        "platform": env.get("QT_QPA_PLATFORM", "default"),
+        "runs": args.runs,
+        "median_ms": {
+            phase: statistics.median(run[phase] for run in runs) * 1000
+            for phase in phases
+        },
+        "min_ms": {phase: min(run[phase] for run in runs) * 1000 for phase in phases},
+        "heaviest_imports_ms": {
+            name: cumulative / 1000
+            for cumulative, name in heaviest_imports(env, 8)
+        },
+    }
+
+    print(f"{args.runs} runs, {report['platform']} platform")
+    print(f"{'phase':<14}{'median':>10}{'min':>10}")
+    for phase in phases:
+        print(
+            f"{phase:<14}{report['median_ms'][phase]:>8.1f}ms"
+            f"{report['min_ms'][phase]:>8.1f}ms"
+        )
+    print("heaviest imports:")
+    for name, ms in report["heaviest_imports_ms"].items():
+        print(f"  {name:<32}{ms:>8.1f}ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
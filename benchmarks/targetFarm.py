@@ -0,0 +1,205 @@
+import errno
+import heapq
+import itertools
+import random
+import selectors
+import socket
+import threading
+import time
+
+"""
+Local loopback target farm for the scan benchmarks
+Listens on a handful of 127.0.0.0/8 addresses (Linux routes the whole /8
+to lo), every benchmark port gets one role per host:
+  open     - TCP listener that accepts and closes,
+             UDP socket that answers every datagram
+  filtered - TCP listener with listen(0) and a full accept queue, the
+             kernel drops further SYNs, so probes time out like behind a
+             firewall. UDP socket that never answers
+  closed   - nothing bound, the kernel answers RST / ICMP port unreachable
+Loopback itself adds no RTT, a filtered probe costs exactly the scanner's
+timeout, so that timeout is the latency knob. delays={"OPEN": seconds}
+holds every accepted connection and every UDP answer that long before
+closing / replying. Only the farm's own sockets can be slowed down, closed
+and filtered ports are answered (or not) by the kernel. A connect scan
+still gets its SYN-ACK at once, it sees the delay as banners arriving late
+and as a full accept queue once more connections are held than it holds.
+"""
+
+# roles the farm answers for itself, the kernel handles the rest
+DELAYABLE_ROLES = ("OPEN",)
+
+
+class TargetFarm:
+    """Open, closed and filtered TCP/UDP ports on loopback addresses"""
+
+    def __init__(
+        self,
+        hosts=4,
+        ports=1000,
+        udp_ports=100,
+        base_port=30000,
+        open_ratio=0.1,
+        filtered_ratio=0.05,
+        seed=1,
+        first_address="127.1.0.1",
+        delays=None,
+    ):
+        # role -> seconds before an accepted connection is closed or a
+        # datagram is answered
+        self.delays = dict(delays or {})
+        for role in self.delays:
+            if role not in DELAYABLE_ROLES:
+                raise ValueError(
+                    f"{role} ports are answered by the kernel and cannot be delayed"
+                )
+        first = int.from_bytes(socket.inet_aton(first_address), "big")
+        self.addresses = [
+            socket.inet_ntoa((first + i).to_bytes(4, "big")) for i in range(hosts)
+        ]
+        self.tcp_ports = list(range(base_port, base_port + ports))
+        self.udp_ports = list(range(base_port, base_port + udp_ports))
+        self.open_ratio = open_ratio
+        self.filtered_ratio = filtered_ratio
+        self.random = random.Random(seed)
+        self.expected = {}  # (proto, address, port) -> OPEN/CLOSED/FILTERED
+        self.sockets = []
+        self.selector = selectors.DefaultSelector()
+        self.delayed = []  # heap of (due, tiebreak, action)
+        self.tiebreak = itertools.count()
+        self.running = False
+        self.thread = None
+
+    def role(self):
+        roll = self.random.random()
+        if roll < self.open_ratio:
+            return "OPEN"
+        if roll < self.open_ratio + self.filtered_ratio:
+            return "FILTERED"
+        return "CLOSED"
+
+    def start(self):
+        for address in self.addresses:
+            for port in self.tcp_ports:
+                self.expected[("tcp", address, port)] = self.add_tcp(
+                    address, port, self.role()
+                )
+            for port in self.udp_ports:
+                self.expected[("udp", address, port)] = self.add_udp(
+                    address, port, self.role()
+                )
+        # ports something else already holds are left out of the scoring
+        self.expected = {k: v for k, v in self.expected.items() if v is not None}
+
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self
+
+    def add_tcp(self, address, port, role):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((address, port))
+        except OSError as e:
+            sock.close()
+            if e.errno == errno.EADDRINUSE:
+                return None
+            raise
+        if role == "CLOSED":
+            sock.close()
+            return role
+
+        self.sockets.append(sock)
+        if role == "OPEN":
+            sock.listen(1024)
+            sock.setblocking(False)
+            self.selector.register(sock, selectors.EVENT_READ, self.accept)
+            return role
+
+        # filtered: fill the one slot accept queue and never accept
+        sock.listen(0)
+        for _ in range(2):
+            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            client.setblocking(False)
+            client.connect_ex((address, port))
+            self.sockets.append(client)
+        time.sleep(0.001)
+        return role
+
+    def add_udp(self, address, port, role):
+        if role == "CLOSED":
+            return role
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind((address, port))
+        except OSError as e:
+            sock.close()
+            if e.errno == errno.EADDRINUSE:
+                return None
+            raise
+        sock.setblocking(False)
+        self.sockets.append(sock)
+        if role == "OPEN":
+            self.selector.register(sock, selectors.EVENT_READ, self.answer)
+        return role
+
+    def later(self, role, action):
+        # run action after role's delay, right away without one
+        delay = self.delays.get(role)
+        if not delay:
+            action()
+            return
+        due = time.monotonic() + delay
+        heapq.heappush(self.delayed, (due, next(self.tiebreak), action))
+
+    def accept(self, sock):
+        try:
+            client, _ = sock.accept()
+        except OSError:
+            return
+        self.later("OPEN", client.close)
+
+    def answer(self, sock):
+        try:
+            data, peer = sock.recvfrom(4096)
+        except OSError:
+            return
+
+        def reply():
+            try:
+                sock.sendto(data or b"\0", peer)
+            except OSError:
+                pass
+
+        self.later("OPEN", reply)
+
+    def serve(self):
+        while self.running:
+            timeout = 0.1
+            if self.delayed:
+                timeout = min(timeout, max(0.0, self.delayed[0][0] - time.monotonic()))
+            for key, _ in self.selector.select(timeout=timeout):
+                key.data(key.fileobj)
+            now = time.monotonic()
+            while self.delayed and self.delayed[0][0] <= now:
+                heapq.heappop(self.delayed)[2]()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        self.selector.close()
+        # close the connections still held
+        for _, _, action in self.delayed:
+            action()
+        self.delayed = []
+        for sock in self.sockets:
+            sock.close()
+        self.sockets = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
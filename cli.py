@@ -0,0 +1,354 @@
+import argparse
+import signal
+import sys
+import threading
+import time
+from resultSink import FORMATS, open_sink
+from scanScheduler import IPV6_SAMPLE, ScanScheduler, parse_targets
+
+"""
+Headless command line scanner, for cron jobs and boxes without a display
+Drives PortScanner directly and never imports Qt. Results stream to stdout
+(or a file) while the scan runs, the summary goes to stderr. The engine,
+checkpoint and history modules load after the arguments are parsed, so
+--help and usage errors do not pay for asyncio or sqlite3.
+
+  python cli.py 10.0.0.0/24 -p top-100 --rate 2000 > results.jsonl
+  python cli.py example.com -p 1-65535 -o scan.csv --open
+  python cli.py 192.168.1.10 -p top-100 --banners --open
+  python cli.py example.com 2001:db8::/64 -p 22,443 --dual-stack
+  python cli.py 10.0.0.0/24 -p top-1000 --changes   # diff vs the last run
+"""
+
+# portScanner.ENGINES, not imported here to keep startup light
+ENGINES = ("sequential", "async", "threads", "processes", "syn", "udp")
+
+# results compared against the history per batch, not per port
+HISTORY_BATCH = 500
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Headless network port scanner"
+    )
+    parser.add_argument(
+        "targets", nargs="+", help="IP addresses, hostnames or CIDR blocks"
+    )
+    parser.add_argument(
+        "-p",
+        "--ports",
+        default="top-1000",
+        help='ports to scan, e.g. "22,80,8000-8010" or "top-100" (default top-1000)',
+    )
+    parser.add_argument(
+        "-e",
+        "--engine",
+        choices=ENGINES,
+        default="async",
+        help="scan engine (default async)",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=500,
+        help="probes in flight at once (default 500)",
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        type=float,
+        default=1.0,
+        help="connect timeout in seconds, max timeout with --adaptive",
+    )
+    parser.add_argument(
+        "--adaptive", action="store_true", help="RTT-adaptive per-host timeouts"
+    )
+    parser.add_argument(
+        "--min-timeout",
+        type=float,
+        default=0.05,
+        help="lower bound for adaptive timeouts (default 0.05)",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=0, help="probes/sec cap, 0 = unlimited"
+    )
+    parser.add_argument(
+        "--host-rate",
+        type=float,
+        default=0,
+        help="probes/sec cap per host, 0 = unlimited",
+    )
+    parser.add_argument(
+        "--discover",
+        action="store_true",
+        help="ping sweep first, only scan live hosts",
+    )
+    parser.add_argument(
+        "--dual-stack",
+        action="store_true",
+        help="scan hostnames over both IPv4 and IPv6",
+    )
+    parser.add_argument(
+        "--ipv6-first",
+        action="store_true",
+        help="with --dual-stack, probe IPv6 before IPv4 (happy eyeballs order)",
+    )
+    parser.add_argument(
+        "--ipv6-sample",
+        type=int,
+        default=IPV6_SAMPLE,
+        metavar="N",
+        help=f"addresses scanned per IPv6 prefix larger than N (default {IPV6_SAMPLE})",
+    )
+    parser.add_argument(
+        "--banners",
+        action="store_true",
+        help="fingerprint open ports (banners, probes) for service versions",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="output file, - for stdout (default)",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=FORMATS,
+        help="output format (default from the file extension, jsonl on stdout)",
+    )
+    parser.add_argument("--open", action="store_true", help="only output open ports")
+    parser.add_argument(
+        "--checkpoint",
+        help="checkpoint file, an unfinished scan with the same file is resumed",
+    )
+    parser.add_argument(
+        "--history",
+        nargs="?",
+        const=True,
+        metavar="PATH",
+        help="record the scan in a SQLite history "
+        "(default ~/.port_scanner/history.sqlite)",
+    )
+    parser.add_argument(
+        "--changes",
+        action="store_true",
+        help="only output ports whose status changed since the last recorded "
+        'scan, with a "previous" status (implies --history)',
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="no summary on stderr"
+    )
+    parser.add_argument(
+        "--stats",
+        type=float,
+        metavar="SECONDS",
+        help="print rate, in-flight, RTT and error counters to stderr this often",
+    )
+    return parser
+
+
+def open_checkpoint(path, scheduler):
+    from scanCheckpoint import ScanCheckpoint
+
+    # resumes only if the checkpoint belongs to the same targets and ports
+    families = 2 if scheduler.dual_stack else 1
+    if ScanCheckpoint.exists(path):
+        checkpoint = ScanCheckpoint.open(path)
+        if (
+            checkpoint.targets == scheduler.targets
+            and checkpoint.ports == scheduler.ports
+            and checkpoint.families == families
+        ):
+            return checkpoint
+        checkpoint.remove()
+    return ScanCheckpoint.create(
+        path, scheduler.targets, scheduler.ports, families=families
+    )
+
+
+def print_stats(metrics, interval, done):
+    # one line per interval from the engine's live counters
+    while not done.wait(interval):
+        snapshot = metrics.snapshot()
+        eta = snapshot["eta"]
+        errors = ", ".join(f"{k} {v}" for k, v in snapshot["errors"].items())
+        print(
+            f"[{snapshot['elapsed']:.0f}s] {snapshot['completed']}/{snapshot['total']}"
+            f" {snapshot['rate']:.0f}/s in flight {snapshot['in_flight']}"
+            f" rtt p50 {snapshot['rtt_p50']}ms p99 {snapshot['rtt_p99']}ms"
+            f" eta {'-' if eta is None else f'{eta:.0f}s'}"
+            + (f" errors: {errors}" if errors else ""),
+            file=sys.stderr,
+        )
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from portScanner import PortScanner
+
+    targets = parse_targets(" ".join(args.targets), args.ipv6_sample)
+    try:
+        scheduler = ScanScheduler(
+            targets,
+            args.ports,
+            dual_stack=args.dual_stack,
+            happy_eyeballs=args.ipv6_first,
+        )
+    except ValueError as e:
+        print(f"Invalid ports: {e}", file=sys.stderr)
+        return 2
+    if targets and scheduler.ports:
+        # bad hostnames fail here, before any probe is sent
+        scheduler.resolve()
+        if scheduler.unresolved:
+            print(
+                f"Could not resolve, skipped: {', '.join(scheduler.unresolved)}",
+                file=sys.stderr,
+            )
+    if not scheduler.targets or not scheduler.ports:
+        print("Nothing to scan", file=sys.stderr)
+        return 2
+    if args.adaptive and args.min_timeout > args.timeout:
+        print("Minimum timeout cannot be greater than the timeout", file=sys.stderr)
+        return 2
+
+    try:
+        sink = open_sink(args.output, args.format)
+    except (OSError, ValueError) as e:
+        print(f"Cannot write results: {e}", file=sys.stderr)
+        return 2
+
+    scanner = PortScanner(
+        args.timeout,
+        engine=args.engine,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        host_rate=args.host_rate,
+        adaptive_timing=args.adaptive,
+        min_timeout=args.min_timeout,
+        max_timeout=args.timeout,
+        discover=args.discover,
+        banners=args.banners,
+    )
+    if not args.quiet:
+        scanner.discovery_callback = lambda live, total: print(
+            f"Live hosts: {live} / {total}", file=sys.stderr
+        )
+
+    history = diff = None
+    history_path = args.history
+    if history_path or args.changes:
+        import sqlite3
+        from scanHistory import DEFAULT_HISTORY, ScanHistory
+
+        if history_path in (None, True):
+            history_path = DEFAULT_HISTORY
+
+        try:
+            history = ScanHistory(history_path)
+            diff = history.start_scan(scheduler.targets, scheduler.ports)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Scan history unavailable: {e}", file=sys.stderr)
+            sink.close()
+            return 2
+
+    # scan and banner grabber threads both write
+    sink_lock = threading.Lock()
+    # results not yet compared against the history, diffed in batches
+    pending = []
+    changed = 0
+
+    def write(result):
+        with sink_lock:
+            sink.write(result)
+
+    def compare():
+        nonlocal changed
+        with sink_lock:
+            batch = pending[:]
+            pending.clear()
+            changes = diff.update(batch)
+            changed += len(changes)
+            if args.changes:
+                sink.write_batch(changes)
+
+    def callback(result, current, total):
+        if diff:
+            with sink_lock:
+                pending.append(result)
+                full = len(pending) >= HISTORY_BATCH
+            if full:
+                compare()
+        if args.changes:
+            return
+        if result["status"] == "OPEN":
+            # with --banners open ports are written once fingerprinted
+            if not scanner.banners:
+                write(result)
+        elif not args.open:
+            write(result)
+
+    if not args.changes:
+        scanner.banner_callback = write
+
+    checkpoint = None
+    if args.checkpoint:
+        checkpoint = open_checkpoint(args.checkpoint, scheduler)
+
+    # first ^C stops the scan cleanly (results and checkpoint are kept),
+    # a second one aborts
+    interrupted = False
+
+    def on_interrupt(signum, frame):
+        nonlocal interrupted
+        interrupted = True
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        scanner.stop_scan()
+
+    signal.signal(signal.SIGINT, on_interrupt)
+    stats_done = threading.Event()
+    if args.stats:
+        threading.Thread(
+            target=print_stats,
+            args=(scanner.metrics, args.stats, stats_done),
+            daemon=True,
+        ).start()
+    start = time.monotonic()
+    try:
+        results = scanner.scan_targets(
+            scheduler, callback=callback, checkpoint=checkpoint
+        )
+        if diff:
+            compare()
+    finally:
+        stats_done.set()
+        sink.close()
+        if history:
+            if diff:
+                diff.finish(complete=not interrupted)
+            history.close()
+        if checkpoint:
+            if interrupted:
+                checkpoint.close()
+            else:
+                checkpoint.remove()
+    elapsed = time.monotonic() - start
+
+    if not args.quiet:
+        counts = results.summary()
+        state = "interrupted" if interrupted else "done"
+        print(
+            f"Scan {state}: {counts['TOTAL']} probes in {elapsed:.2f}s, "
+            f"{counts['OPEN']} open, {counts['CLOSED']} closed, "
+            f"{counts['FILTERED']} filtered, {counts['ERROR']} errors",
+            file=sys.stderr,
+        )
+        if diff:
+            print(f"Changes since the last scan: {changed}", file=sys.stderr)
+    return 130 if interrupted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,5 @@
-from PySide6.QtWidgets import QVBoxLayout, QWidget
+from PySide6.QtWidgets import QGridLayout, QVBoxLayout, QWidget
 from components.styleComponents import UIComponents
-from styles import Styles
 
 
 class LayoutManager:
@@ -8,7 +7,7 @@ class LayoutManager:
     def create_sidebar_section(*widgets):
         """Create the left sidebar for inputs and controls"""
         section = QWidget()
-        section.setStyleSheet(Styles.SIDEBAR_BACKGROUND)
+        section.setProperty("panel", "sidebar")
         layout = QVBoxLayout(section)
         layout.setContentsMargins(0, 0, 0, 10)
         layout.setSpacing(5)
@@ -17,6 +16,27 @@ class LayoutManager:
             layout.addWidget(widget)
         return section
 
+    @staticmethod
+    def create_collapsible_section(title, *widgets, expanded=False):
+        """Create a sidebar section whose body a toggle button shows/hides,
+        returns (section, body), rows can be added to body.layout()"""
+        section = LayoutManager.create_sidebar_section()
+        body = LayoutManager.create_sidebar_section(*widgets)
+        body.layout().setContentsMargins(0, 0, 0, 0)
+        toggle = UIComponents.create_button("")
+        toggle.setCheckable(True)
+
+        def on_toggled(checked):
+            toggle.setText(f"{'▾' if checked else '▸'} {title}")
+            body.setVisible(checked)
+
+        toggle.toggled.connect(on_toggled)
+        toggle.setChecked(expanded)
+        on_toggled(expanded)
+        section.layout().addWidget(toggle)
+        section.layout().addWidget(body)
+        return section, body
+
     @staticmethod
     def create_port_range_layout(start_port, end_port):
         """Create a layout for port range inputs"""
@@ -33,13 +53,11 @@ class LayoutManager:
         return layout
 
     @staticmethod
-    def create_button_grid(*buttons):
-        """Create a grid layout for buttons"""
-        layout = QVBoxLayout()
-        layout.setSpacing(12)
+    def create_button_grid(*buttons, columns=2):
+        """Create a grid layout for buttons, `columns` per row"""
+        layout = QGridLayout()
+        layout.setSpacing(8)
 
         for i, button in enumerate(buttons):
-            layout.addWidget(button)
-            if i < len(buttons) - 1:
-                layout.addSpacing(5)
+            layout.addWidget(button, i // columns, i % columns)
         return layout
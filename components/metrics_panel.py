@@ -0,0 +1,130 @@
+from PySide6.QtWidgets import QWidget, QGridLayout, QLabel
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QPainter, QColor
+from styles import Styles
+from scanMetrics import RTT_BUCKETS
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def format_ms(ms):
+    if ms is None:
+        return "-"
+    if ms == float("inf"):
+        return f">{RTT_BUCKETS[-1]:.0f}ms"
+    return f"<{ms:g}ms"
+
+
+class RttHistogram(QWidget):
+    """Bar per RTT bucket, log2 spaced"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.counts = []
+        self.bar_color = QColor(Styles.OPEN)
+        self.setMinimumHeight(40)
+        self.setToolTip(
+            f"RTT histogram, {RTT_BUCKETS[0]:g}ms to {RTT_BUCKETS[-1]:g}ms+ (log2)"
+        )
+
+    def set_counts(self, counts):
+        if counts != self.counts:
+            self.counts = counts
+            self.update()
+
+    def paintEvent(self, event):
+        if not self.counts:
+            return
+        painter = QPainter(self)
+        peak = max(self.counts) or 1
+        width = self.width() / len(self.counts)
+        height = self.height()
+        for i, count in enumerate(self.counts):
+            if not count:
+                continue
+            bar = max(1, int(height * count / peak))
+            left = int(i * width)
+            painter.fillRect(
+                left, height - bar, max(1, int(width) - 1), bar, self.bar_color
+            )
+
+
+class MetricsPanel(QWidget):
+    """Live engine counters, polls a ScanMetrics snapshot on a timer"""
+
+    REFRESH_MS = 250
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.metrics = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QGridLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setHorizontalSpacing(12)
+        layout.setVerticalSpacing(2)
+
+        self.values = {}
+        fields = ("Rate", "In flight", "ETA", "RTT p50", "RTT p99", "Errors")
+        for i, name in enumerate(fields):
+            title = QLabel(name)
+            value = QLabel("-")
+            value.setTextInteractionFlags(Qt.TextSelectableByMouse)
+            layout.addWidget(title, 0, i)
+            layout.addWidget(value, 1, i)
+            self.values[name] = value
+
+        self.histogram = RttHistogram()
+        layout.addWidget(self.histogram, 0, len(fields), 2, 1)
+        layout.setColumnStretch(len(fields), 1)
+
+    def attach(self, metrics):
+        # start polling a running scan's ScanMetrics
+        self.metrics = metrics
+        self.refresh()
+        self.timer.start()
+
+    def detach(self):
+        # one last refresh for the final numbers, then stop polling
+        self.refresh()
+        self.timer.stop()
+        self.metrics = None
+
+    def clear(self):
+        self.timer.stop()
+        self.metrics = None
+        for value in self.values.values():
+            value.setText("-")
+            value.setToolTip("")
+        self.histogram.set_counts([])
+
+    def refresh(self):
+        if self.metrics is None:
+            return
+        snapshot = self.metrics.snapshot()
+
+        in_flight = snapshot["in_flight"]
+        errors = snapshot["errors"]
+        self.values["Rate"].setText(f"{snapshot['rate']:.0f}/s")
+        self.values["In flight"].setText("-" if in_flight is None else str(in_flight))
+        self.values["ETA"].setText(format_duration(snapshot["eta"]))
+        self.values["RTT p50"].setText(format_ms(snapshot["rtt_p50"]))
+        self.values["RTT p99"].setText(format_ms(snapshot["rtt_p99"]))
+        self.values["Errors"].setText(str(sum(errors.values())))
+        self.values["Errors"].setToolTip(
+            "\n".join(f"{name}: {count}" for name, count in errors.items())
+        )
+        self.histogram.set_counts(snapshot["rtt"])
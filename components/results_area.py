@@ -2,24 +2,31 @@ from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QHBoxLayout,
-    QScrollArea,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QSizePolicy,
     QTextBrowser,
     QAbstractItemView,
     QFrame,
     QHeaderView,
 )
-from PySide6.QtGui import QColor
 from PySide6.QtCore import Qt
 from styles import Styles
 from components.styleComponents import UIComponents
+from components.metrics_panel import MetricsPanel
 
 
 class ResultsArea(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
+        # the table and summary are built on first use (or once the window
+        # is up, see build_deferred), not while the window is constructed
+        self.results_layout = None
+        self.results_model = None
+        self.results_proxy = None
+        self.results_table = None
+        self.summary_text_area = None
+        self.show_all = True
+        self.changes_only = False
         self.setup_ui()
 
     def set_progress(self, value):
@@ -27,8 +34,17 @@ class ResultsArea(QWidget):
         self.progress_bar.setValue(value)
 
     def set_summary(self, text):
+        self.build_deferred()
         self.summary_text_area.setPlainText(text)
 
+    def set_rate(self, achieved, requested):
+        # live probe rate, requested is 0 when unlimited
+        if requested:
+            text = f"Rate: {achieved:.0f} / {requested:.0f} probes/s"
+        else:
+            text = f"Rate: {achieved:.0f} probes/s (unlimited)"
+        self.rate_label.setText(text)
+
     def setup_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(15, 15, 15, 15)
@@ -36,21 +52,27 @@ class ResultsArea(QWidget):
 
         self.create_progress_info_area(layout)
 
-        # container for results and summary
+        # container for results and summary, filled by build_deferred
         results_container = QFrame()
-        results_layout = QVBoxLayout(results_container)
-        results_layout.setContentsMargins(0, 0, 0, 0)
-        results_layout.setSpacing(10)
-
-        self.create_results_table(results_layout)
-        self.create_summary_area(results_layout)
+        self.results_layout = QVBoxLayout(results_container)
+        self.results_layout.setContentsMargins(0, 0, 0, 0)
+        self.results_layout.setSpacing(10)
 
         layout.addWidget(results_container, 1)
 
+    def build_deferred(self):
+        if self.results_table is not None:
+            return
+        self.create_results_table(self.results_layout)
+        self.create_summary_area(self.results_layout)
+
     def reset_ui(self):
-        self.results_table.setRowCount(0)
+        if self.results_table is not None:
+            self.results_model.clear()
+            self.summary_text_area.clear()
         self.info_text_area.clear()
-        self.summary_text_area.clear()
+        self.rate_label.clear()
+        self.metrics_panel.clear()
         self.progress_bar.setValue(0)
 
     def create_progress_info_area(self, layout):
@@ -75,28 +97,34 @@ class ResultsArea(QWidget):
 
         self.info_text_area = QTextBrowser()
         self.info_text_area.setPlaceholderText("")
-        self.info_text_area.setStyleSheet(Styles.TEXT_BOX)
         self.info_text_area.setMaximumHeight(90)
 
+        self.rate_label = UIComponents.create_label("", "w")
+
+        # live engine counters while a scan runs
+        self.metrics_panel = MetricsPanel()
+
         info_layout.addWidget(self.info_text_area)
+        info_layout.addWidget(self.rate_label)
+        info_layout.addWidget(self.metrics_panel)
         text_layout.addWidget(info_widget)
 
         layout.addWidget(widget)
 
     def create_results_table(self, layout):
+        from components.results_model import ResultsTableModel, ResultsFilterProxy
+
         layout.addWidget(UIComponents.create_label("Results:", "w"))
 
-        table_scroll = QScrollArea()
-        table_scroll.setWidgetResizable(True)
-        table_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        table_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.results_model = ResultsTableModel(self)
+        self.results_proxy = ResultsFilterProxy(self)
+        self.results_proxy.set_show_all(self.show_all)
+        self.results_proxy.set_changes_only(self.changes_only)
+        self.results_proxy.setSourceModel(self.results_model)
 
-        self.results_table = QTableWidget()
-        self.results_table.setColumnCount(5)
-        self.results_table.setRowCount(1)
-        self.results_table.setHorizontalHeaderLabels(
-            ["Status", "Port", "State", "Service", "Response Time"]
-        )
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_proxy)
+        self.results_table.verticalHeader().setDefaultSectionSize(24)
 
         # table settings
         header = self.results_table.horizontalHeader()
@@ -104,10 +132,11 @@ class ResultsArea(QWidget):
         header.setMinimumSectionSize(40)
 
         self.results_table.setColumnWidth(0, 60)
-        self.results_table.setColumnWidth(1, 80)
+        self.results_table.setColumnWidth(1, 120)
         self.results_table.setColumnWidth(2, 80)
-        self.results_table.setColumnWidth(3, 140)
-        self.results_table.setColumnWidth(4, 120)
+        self.results_table.setColumnWidth(3, 80)
+        self.results_table.setColumnWidth(4, 140)
+        self.results_table.setColumnWidth(5, 120)
         self.results_table.setAlternatingRowColors(True)
         self.results_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.results_table.setSortingEnabled(True)
@@ -116,9 +145,8 @@ class ResultsArea(QWidget):
         )  # cannot edit
 
         self.results_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        table_scroll.setWidget(self.results_table)
 
-        layout.addWidget(table_scroll, 1)
+        layout.addWidget(self.results_table, 1)
 
     def create_summary_area(self, layout):
         container = QWidget()
@@ -133,46 +161,31 @@ class ResultsArea(QWidget):
         self.summary_text_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.summary_text_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.summary_text_area.setPlaceholderText("")
-        self.summary_text_area.setStyleSheet(Styles.TEXT_BOX)
 
         container_layout.addWidget(self.summary_text_area)
 
         layout.addWidget(container)
 
-    def add_scan_result(self, result, show_all):
-        # add a single scan result to the table
-        should_show = show_all or result["status"] in ["OPEN"]
-
-        if not should_show:
-            return
+    def add_scan_results(self, results, changes=None):
+        # bulk append, filtering and sorting happen in the proxy
+        self.build_deferred()
+        self.results_model.append_results(results, changes)
 
-        status_type = {"OPEN": "✓", "CLOSED": "✘", "ERROR": "!"}.get(
-            result["status"], "?"
-        )
-
-        row_position = self.results_table.rowCount()
-        self.results_table.insertRow(row_position)
-
-        # create and add items to row
-        # 0 indexed columns
-        self.results_table.setItem(row_position, 0, QTableWidgetItem(status_type))
-        self.results_table.setItem(
-            row_position, 1, QTableWidgetItem(str(result["port"]))
-        )
-        self.results_table.setItem(row_position, 2, QTableWidgetItem(result["status"]))
-        self.results_table.setItem(row_position, 3, QTableWidgetItem(result["service"]))
-        self.results_table.setItem(
-            row_position, 4, QTableWidgetItem(result["response_time"])
+    def update_service(self, result):
+        # fingerprinted OPEN port, replaces the port table guess
+        self.build_deferred()
+        self.results_model.update_service(
+            result["host"], result["port"], result["family"], result["service"]
         )
 
-        # state column color styling
-        status_item = self.results_table.item(row_position, 2)
-        if result["status"] == "OPEN":
-            status_item.setBackground(QColor(Styles.OPEN))
-            status_item.setForeground(QColor(Styles.DARK_TEXT))
-        elif result["status"] == "CLOSED":
-            status_item.setBackground(QColor(Styles.CLOSED))
-            status_item.setForeground(QColor(Styles.TEXT_COLOR))
-        else:  # ERROR
-            status_item.setBackground(QColor(Styles.TEXT_COLOR))
-            status_item.setForeground(QColor(Styles.DARK_TEXT))
+    def set_show_all(self, show_all):
+        # re-filter what is already there, no rescan needed
+        self.show_all = show_all
+        if self.results_proxy is not None:
+            self.results_proxy.set_show_all(show_all)
+
+    def set_changes_only(self, changes_only):
+        # only ports whose status differs from the last scan
+        self.changes_only = changes_only
+        if self.results_proxy is not None:
+            self.results_proxy.set_changes_only(changes_only)
@@ -0,0 +1,170 @@
+import math
+from PySide6.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QModelIndex,
+    QSortFilterProxyModel,
+)
+from PySide6.QtGui import QColor
+from styles import Styles
+from scanResults import ScanResultStore, PortStatus
+
+STATUS_ICONS = {
+    PortStatus.OPEN: "✓",
+    PortStatus.CLOSED: "✘",
+    PortStatus.ERROR: "!",
+    PortStatus.FILTERED: "?",
+}
+
+# role used by the proxy to sort on raw values instead of display text
+SORT_ROLE = Qt.UserRole + 1
+
+
+class ResultsTableModel(QAbstractTableModel):
+    """Table view over a ScanResultStore, cells are formatted when painted"""
+
+    HEADERS = ["Status", "Host", "Port", "State", "Service", "Response Time"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.colors = {
+            PortStatus.OPEN: (QColor(Styles.OPEN), QColor(Styles.DARK_TEXT)),
+            PortStatus.CLOSED: (QColor(Styles.CLOSED), QColor(Styles.TEXT_COLOR)),
+            PortStatus.ERROR: (QColor(Styles.TEXT_COLOR), QColor(Styles.DARK_TEXT)),
+            PortStatus.FILTERED: (QColor(Styles.FILTERED), QColor(Styles.TEXT_COLOR)),
+        }
+        self.store = ScanResultStore()
+        # (host, port, family) -> row of OPEN results, for late service updates
+        self.open_rows = {}
+        # fingerprints that arrived before their row did
+        self.pending_services = {}
+        # row -> status in the last scan (None = port not seen before)
+        self.changes = {}
+
+    def append_results(self, results, changes=None):
+        # changes: {(host, port, family): previous status} from ScanDiff
+        if not results:
+            return
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(results) - 1)
+        for result in results:
+            row = self.store.append(result)
+            key = (result["host"], result["port"], result.get("family", 4))
+            if changes and key in changes:
+                self.changes[row] = changes[key]
+            if result["status"] == "OPEN":
+                self.open_rows[key] = row
+                if key in self.pending_services:
+                    self.store.set_service(row, self.pending_services.pop(key))
+        self.endInsertRows()
+
+    def update_service(self, host, port, family, service):
+        key = (host, port, family)
+        row = self.open_rows.get(key)
+        if row is None:
+            self.pending_services[key] = service
+            return
+        self.store.set_service(row, service)
+        index = self.index(row, 4)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def clear(self):
+        self.beginResetModel()
+        self.store = ScanResultStore()
+        self.open_rows = {}
+        self.pending_services = {}
+        self.changes = {}
+        self.endResetModel()
+
+    def status(self, row):
+        return self.store.status(row)
+
+    def changed(self, row):
+        return row in self.changes
+
+    def change_counts(self):
+        # (opened, closed, other) changes since the last scan
+        opened = closed = 0
+        for row, previous in self.changes.items():
+            if self.store.status(row) == PortStatus.OPEN:
+                opened += 1
+            elif previous == "OPEN":
+                closed += 1
+        return opened, closed, len(self.changes) - opened - closed
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        store = self.store
+        row = index.row()
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return STATUS_ICONS[store.status(row)]
+            if column == 1:
+                return store.label(row)
+            if column == 2:
+                return str(store.port(row))
+            if column == 3:
+                if row not in self.changes:
+                    return store.status(row).name
+                previous = self.changes[row]
+                was = f"was {previous}" if previous else "new"
+                return f"{store.status(row).name} ({was})"
+            if column == 4:
+                return store.service(row)
+            return store.response_time(row)
+
+        if role == SORT_ROLE:
+            if column == 2:
+                return store.port(row)
+            if column == 5:
+                latency = store.latency(row)
+                return math.inf if math.isnan(latency) else latency
+            return self.data(index, Qt.DisplayRole)
+
+        # state column color styling
+        if column == 3 and role in (Qt.BackgroundRole, Qt.ForegroundRole):
+            background, foreground = self.colors[store.status(row)]
+            return background if role == Qt.BackgroundRole else foreground
+
+        return None
+
+
+class ResultsFilterProxy(QSortFilterProxyModel):
+    """Sorting plus the show all / open only / changes only filter"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.show_all = True
+        self.changes_only = False
+        self.setSortRole(SORT_ROLE)
+
+    def set_changes_only(self, changes_only):
+        if changes_only != self.changes_only:
+            self.changes_only = changes_only
+            self.invalidateFilter()
+
+    def set_show_all(self, show_all):
+        if show_all != self.show_all:
+            self.show_all = show_all
+            self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.changes_only:
+            return self.sourceModel().changed(source_row)
+        if self.show_all:
+            return True
+        return self.sourceModel().status(source_row) == PortStatus.OPEN
@@ -1,31 +1,54 @@
-from PySide6.QtWidgets import QFrame, QWidget, QHBoxLayout, QVBoxLayout
+from PySide6.QtWidgets import (
+    QFrame,
+    QWidget,
+    QHBoxLayout,
+    QVBoxLayout,
+    QFileDialog,
+    QScrollArea,
+)
 from PySide6.QtCore import Signal, Qt
-from styles import Styles
+from components.commonPorts import top_ports
 from .layout_manager import LayoutManager
 from components.styleComponents import UIComponents
 
 
+# port profile name -> number of top ports (None = start/end range)
+PORT_PROFILES = {
+    "Port Range": None,
+    "Top 100 Ports": 100,
+    "Top 1000 Ports": 1000,
+}
+
+# ranks shuffled together when randomizing the top ports order
+RANK_BAND_SIZE = 10
+
+
 class Sidebar(QFrame):
     scan_clicked = Signal()
+    resume_clicked = Signal()
     stop_clicked = Signal()
     clear_clicked = Signal()
     show_all_changed = Signal(int)
+    changes_only_changed = Signal(int)
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_window = parent
         self.setup_ui()
 
-    def set_scan_state(self, scanning):
+    def set_scan_state(self, scanning, resumable=False):
         # update button states based on scan status
         self.scan_button.setEnabled(not scanning)
+        self.resume_button.setEnabled(not scanning and resumable)
         self.clear_button.setEnabled(not scanning)
         self.stop_button.setEnabled(scanning)
-        self.show_all_checkbox.setEnabled(not scanning)
 
     def on_show_all_changed(self, state):
         self.show_all_changed.emit(state)
 
+    def on_changes_only_changed(self, state):
+        self.changes_only_changed.emit(state)
+
     def checkbox_state(self):
         if self.show_all_checkbox:
             return self.show_all_checkbox.checkState() == Qt.Checked
@@ -33,7 +56,7 @@ class Sidebar(QFrame):
 
     def setup_ui(self):
         content = QWidget()
-        content.setStyleSheet(Styles.SIDEBAR_BACKGROUND)
+        content.setProperty("panel", "sidebar")
         layout = QVBoxLayout(content)
 
         layout.setContentsMargins(15, 15, 15, 15)
@@ -42,52 +65,176 @@ class Sidebar(QFrame):
         self.create_target_section(layout)
         self.create_port_section(layout)
         self.create_options_section(layout)
+        self.create_output_section(layout)
         layout.addStretch(1)
         self.create_controls_section(layout)
 
         layout.addStretch()
 
+        # scrolls instead of squeezing the controls on short windows
+        scroll_area = QScrollArea()
+        scroll_area.setFrameShape(QFrame.NoFrame)
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        scroll_area.setWidget(content)
+
         frame_layout = QVBoxLayout(self)
         frame_layout.setContentsMargins(0, 0, 0, 0)
-        frame_layout.addWidget(content)
+        frame_layout.addWidget(scroll_area)
 
     def create_target_section(self, layout):
-        self.target_input = UIComponents.create_input_field("Enter IP or domain")
+        self.target_input = UIComponents.create_input_field(
+            "IP, domain or CIDR (comma separated)"
+        )
         target_section = LayoutManager.create_sidebar_section(
             UIComponents.create_label("Target:", "b"), self.target_input
         )
         layout.addWidget(target_section)
 
     def create_port_section(self, layout):
+        self.port_profile = UIComponents.create_combobox(
+            list(PORT_PROFILES), callback=self.on_port_profile_changed
+        )
+        self.randomize_checkbox = UIComponents.create_checkbox(
+            "Randomize within rank bands", checked=False
+        )
         self.start_port = UIComponents.create_spinbox(1, 65535, 80)
         self.end_port = UIComponents.create_spinbox(1, 65535, 85)
-        port_layout = LayoutManager.create_port_range_layout(
-            self.start_port, self.end_port
+        # only the controls of the selected profile take up room
+        self.port_range = LayoutManager.create_sidebar_section()
+        self.port_range.layout().setContentsMargins(0, 0, 0, 0)
+        self.port_range.layout().addLayout(
+            LayoutManager.create_port_range_layout(self.start_port, self.end_port)
+        )
+        port_section = LayoutManager.create_sidebar_section(
+            UIComponents.create_label("Ports:", "b"),
+            self.port_profile,
+            self.randomize_checkbox,
+            self.port_range,
         )
-        port_section = LayoutManager.create_sidebar_section()
-        port_section.layout().addLayout(port_layout)
         layout.addWidget(port_section)
+        self.on_port_profile_changed(self.port_profile.currentIndex())
+
+    def on_port_profile_changed(self, index):
+        use_range = self.top_port_count() is None
+        self.port_range.setVisible(use_range)
+        self.randomize_checkbox.setVisible(not use_range)
+
+    def top_port_count(self):
+        return PORT_PROFILES[self.port_profile.currentText()]
+
+    def selected_ports(self):
+        # ports in scan order, top-N profiles put likely open ports first
+        count = self.top_port_count()
+        if count is None:
+            return list(range(self.start_port.value(), self.end_port.value() + 1))
+        band_size = RANK_BAND_SIZE if self.randomize_checkbox.isChecked() else 0
+        return top_ports(count, band_size=band_size)
 
     def create_options_section(self, layout):
         self.show_all_checkbox = UIComponents.create_checkbox(
             "Show all ports", checked=True, callback=self.on_show_all_changed
         )
+        # ports whose status differs from the previous scan of the same ports
+        self.changes_only_checkbox = UIComponents.create_checkbox(
+            "Changes only (vs last scan)",
+            checked=False,
+            callback=self.on_changes_only_changed,
+        )
+        self.discover_checkbox = UIComponents.create_checkbox(
+            "Skip dead hosts (ping first)", checked=False
+        )
+        self.banners_checkbox = UIComponents.create_checkbox(
+            "Grab banners / detect versions", checked=False
+        )
+        self.dual_stack_checkbox = UIComponents.create_checkbox(
+            "Dual-stack (IPv4 + IPv6)", checked=False
+        )
         self.timeout_spinbox = UIComponents.create_timer_spinbox(0.0001, 30, 1)
 
         timeout_layout = QHBoxLayout()
         timeout_layout.addWidget(self.timeout_spinbox)
         timeout_layout.addWidget(UIComponents.create_label("sec Timeout:", "b"))
 
+        # adaptive: timeout above is the upper cap, this is the lower one
+        self.adaptive_checkbox = UIComponents.create_checkbox(
+            "Adaptive timeout (RTT based)", checked=False
+        )
+        self.min_timeout_spinbox = UIComponents.create_timer_spinbox(0.001, 30, 0.05)
+        min_timeout_layout = QHBoxLayout()
+        min_timeout_layout.addWidget(self.min_timeout_spinbox)
+        min_timeout_layout.addWidget(UIComponents.create_label("sec Min:", "b"))
+
+        # probes per second, 0 = unlimited
+        self.rate_spinbox = UIComponents.create_spinbox(0, 1000000, 0)
+        self.rate_spinbox.setSpecialValueText("∞")
+        rate_layout = QHBoxLayout()
+        rate_layout.addWidget(self.rate_spinbox)
+        rate_layout.addWidget(UIComponents.create_label("/s Max Rate:", "b"))
+
+        self.host_rate_spinbox = UIComponents.create_spinbox(0, 1000000, 0)
+        self.host_rate_spinbox.setSpecialValueText("∞")
+        host_rate_layout = QHBoxLayout()
+        host_rate_layout.addWidget(self.host_rate_spinbox)
+        host_rate_layout.addWidget(UIComponents.create_label("/s Per Host:", "b"))
+
         options_section = LayoutManager.create_sidebar_section(
             self.show_all_checkbox,
+            self.changes_only_checkbox,
+            self.discover_checkbox,
+            self.banners_checkbox,
+            self.dual_stack_checkbox,
         )
         options_section.layout().addLayout(timeout_layout)
         layout.addWidget(options_section)
 
+        # timing and rate tuning, collapsed by default
+        advanced_section, advanced = LayoutManager.create_collapsible_section(
+            "Advanced", self.adaptive_checkbox
+        )
+        advanced.layout().addLayout(min_timeout_layout)
+        advanced.layout().addLayout(rate_layout)
+        advanced.layout().addLayout(host_rate_layout)
+        layout.addWidget(advanced_section)
+
+    def create_output_section(self, layout):
+        # optional file results are streamed to while scanning
+        self.output_input = UIComponents.create_input_field(
+            "Stream to file (.jsonl/.csv/.bin)"
+        )
+        browse_button = UIComponents.create_button("...", self.on_browse_output)
+        browse_button.setToolTip("Browse")
+        # path and browse button share a row
+        output_layout = QHBoxLayout()
+        output_layout.setSpacing(5)
+        output_layout.addWidget(self.output_input, 1)
+        output_layout.addWidget(browse_button)
+        output_section = LayoutManager.create_sidebar_section(
+            UIComponents.create_label("Output:", "b")
+        )
+        output_section.layout().addLayout(output_layout)
+        layout.addWidget(output_section)
+
+    def on_browse_output(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Stream results to",
+            "scan_results.jsonl",
+            "JSON Lines (*.jsonl);;CSV (*.csv);;Binary records (*.bin)",
+        )
+        if path:
+            self.output_input.setText(path)
+
+    def output_path(self):
+        return self.output_input.text().strip() or None
+
     def create_controls_section(self, layout):
         self.scan_button = UIComponents.create_button(
             "Start Scan", self.scan_clicked.emit
         )
+        self.resume_button = UIComponents.create_button(
+            "Resume Scan", self.resume_clicked.emit
+        )
         self.stop_button = UIComponents.create_button(
             "Stop Scan", self.stop_clicked.emit
         )
@@ -96,7 +243,7 @@ class Sidebar(QFrame):
         )
 
         button_layout = LayoutManager.create_button_grid(
-            self.scan_button, self.stop_button, self.clear_button
+            self.scan_button, self.resume_button, self.stop_button, self.clear_button
         )
         controls_section = LayoutManager.create_sidebar_section()
         controls_section.layout().addLayout(button_layout)
@@ -5,19 +5,24 @@ from PySide6.QtWidgets import (
     QSpinBox,
     QCheckBox,
     QDoubleSpinBox,
+    QComboBox,
 )
-from styles import Styles
 from PySide6.QtCore import Qt
 from components.donutProgressBar import DonutProgressBar
 
 
 class UIComponents:
-    """Styled UI components"""
+    """Styled UI components
+
+    Styling comes from the one application stylesheet (Styles.APPLICATION),
+    the factories only tag widgets with the object name or "variant"
+    property its selectors match on.
+    """
 
     @staticmethod
     def create_header_label(text):
         label = QLabel(text)
-        label.setStyleSheet(Styles.HEADER_LABEL)
+        label.setObjectName("header")
         label.setAlignment(Qt.AlignCenter)
         label.setFixedHeight(50)
         return label
@@ -26,22 +31,20 @@ class UIComponents:
     def create_label(text, value):
         label = QLabel(text)
         if value == "w":
-            label.setStyleSheet(Styles.LABEL)
+            label.setProperty("variant", "light")
         if value == "b":
-            label.setStyleSheet(Styles.SIDEBAR_LABEL)
+            label.setProperty("variant", "sidebar")
         return label
 
     @staticmethod
     def create_input_field(placeholder=""):
         input_field = QLineEdit()
         input_field.setPlaceholderText(placeholder)
-        input_field.setStyleSheet(Styles.INPUT_FIELD)
         return input_field
 
     @staticmethod
     def create_button(text, callback=None):
         button = QPushButton(text)
-        button.setStyleSheet(Styles.BUTTON)
         if callback:
             button.clicked.connect(callback)
         return button
@@ -52,7 +55,6 @@ class UIComponents:
         spinbox.setMinimum(min_val)
         spinbox.setMaximum(max_val)
         spinbox.setValue(default_val)
-        spinbox.setStyleSheet(Styles.SPINBOX_FIELD)
         return spinbox
 
     @staticmethod
@@ -63,18 +65,24 @@ class UIComponents:
         spinbox.setValue(default_val)
         spinbox.setDecimals(3)
         spinbox.setSingleStep(0.1)
-        spinbox.setStyleSheet(Styles.SPINBOX_FIELD)
         return spinbox
 
     @staticmethod
     def create_checkbox(text, checked=False, callback=None):
         checkbox = QCheckBox(text)
         checkbox.setChecked(checked)
-        checkbox.setStyleSheet(Styles.CHECKBOX)
         if callback:
             checkbox.stateChanged.connect(callback)
         return checkbox
 
+    @staticmethod
+    def create_combobox(items, callback=None):
+        combobox = QComboBox()
+        combobox.addItems(items)
+        if callback:
+            combobox.currentIndexChanged.connect(callback)
+        return combobox
+
     @staticmethod
     def create_progress_bar(start_color="#00FF00", end_color="#FF0000"):
         """customizable gradient donut-style circular progress bar"""
@@ -0,0 +1,123 @@
+import ipaddress
+import socket
+import threading
+import time
+
+"""
+Hostname resolution for scan targets
+Every target is resolved once, up front, and the answer is cached so
+repeated scans of the same names (GUI rescans, resumed scans) skip the
+lookup. A and AAAA answers are both kept, IPv4 addresses first, the
+scheduler picks what it scans. getaddrinfo does not expose record TTLs, so
+answers live for a fixed ttl and failures for a shorter negative_ttl. Cache
+misses in a list are resolved concurrently on a small thread pool, the
+system resolver blocks, so one slow name does not serialize the rest.
+"""
+
+DEFAULT_TTL = 300.0
+DEFAULT_NEGATIVE_TTL = 30.0
+
+_default_resolver = None
+
+
+class DnsResolver:
+    """Thread safe hostname -> address cache with TTL eviction"""
+
+    def __init__(
+        self,
+        ttl=DEFAULT_TTL,
+        negative_ttl=DEFAULT_NEGATIVE_TTL,
+        concurrency=32,
+        family=socket.AF_UNSPEC,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = max(1, concurrency)
+        self.family = family
+        self.cache = {}  # name -> (addresses, expires), () = unresolvable
+        self.lock = threading.Lock()
+
+    def cached(self, name, now=None):
+        # addresses tuple, or None when not cached or expired
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            entry = self.cache.get(name)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self.cache[name]
+                return None
+            return entry[0]
+
+    def lookup(self, name):
+        # one blocking getaddrinfo, stored with its TTL
+        try:
+            infos = socket.getaddrinfo(
+                name, None, family=self.family, type=socket.SOCK_STREAM
+            )
+        except (socket.gaierror, UnicodeError):
+            addresses = ()
+        else:
+            # IPv4 first, each family in resolver order
+            infos = sorted(infos, key=lambda info: info[0] != socket.AF_INET)
+            addresses = tuple(dict.fromkeys(info[4][0] for info in infos))
+        ttl = self.ttl if addresses else self.negative_ttl
+        with self.lock:
+            self.cache[name] = (addresses, time.monotonic() + ttl)
+        return addresses
+
+    def resolve(self, name):
+        # first address, None for names that do not resolve
+        addresses = self.resolve_all([name])[name]
+        return addresses[0] if addresses else None
+
+    def resolve_all(self, names):
+        # {name: addresses tuple, () if it does not resolve}, IP literals
+        # pass through untouched
+        results = {}
+        missing = []
+        now = time.monotonic()
+        for name in dict.fromkeys(names):
+            try:
+                ipaddress.ip_address(name)
+            except ValueError:
+                pass
+            else:
+                results[name] = (name,)
+                continue
+            addresses = self.cached(name, now)
+            if addresses is None:
+                missing.append(name)
+            else:
+                results[name] = addresses
+
+        if len(missing) == 1:
+            results[missing[0]] = self.lookup(missing[0])
+        elif missing:
+            # concurrent.futures pulls in logging, only load it when needed
+            from concurrent.futures import ThreadPoolExecutor
+
+            workers = min(self.concurrency, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results.update(zip(missing, pool.map(self.lookup, missing)))
+
+        self.evict_expired(now)
+        return results
+
+    def evict_expired(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            for name in [n for n, (_, expires) in self.cache.items() if expires <= now]:
+                del self.cache[name]
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
+def default_resolver():
+    # shared by every scan in this process, so the cache outlives one scan
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = DnsResolver()
+    return _default_resolver
@@ -0,0 +1,177 @@
+import asyncio
+import errno
+import os
+import select
+import socket
+import struct
+import time
+from components.commonPorts import COMMON_PORTS
+from scanScheduler import address_family
+from synScanner import checksum
+
+"""
+Host discovery (ping sweep) before the port scan, similar to Nmap -sn
+A host counts as alive when any TCP ping to a few likely ports gets an
+answer (SYN-ACK or RST, both prove something is there), or when it answers
+an ICMP echo. ICMP is only used when a raw or ping socket can be opened,
+and only for IPv4, IPv6 addresses rely on the TCP pings.
+Only live hosts move on to the port scan.
+"""
+
+# ports most likely to answer on an arbitrary host, all in COMMON_PORTS
+DISCOVERY_PORTS = tuple(p for p in (80, 443, 22, 445, 3389, 25) if p in COMMON_PORTS)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+# sends that fail with a full socket buffer are retried after a backoff
+ICMP_RETRY_ERRNOS = {errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS}
+ICMP_SEND_RETRIES = 5
+ICMP_RETRY_DELAY = 0.01
+
+
+def open_icmp_socket():
+    # unprivileged ping socket first (Linux ping_group_range), then raw
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+        except OSError:
+            continue
+        sock.setblocking(False)
+        return sock, kind == socket.SOCK_RAW
+    return None, False
+
+
+def icmp_sweep(addresses, timeout, limiter=None):
+    # echo request to every address, returns the ones that replied
+    sock, raw = open_icmp_socket()
+    if sock is None:
+        return set()
+
+    ident = os.getpid() & 0xFFFF
+    wanted = set(addresses)
+    alive = set()
+
+    def receive(duration):
+        # collect replies for up to duration seconds, so waiting for the rate
+        # limiter or a full send buffer does not let the receive buffer overflow
+        deadline = time.monotonic() + duration
+        while len(alive) < len(wanted):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if not readable:
+                break
+            try:
+                packet, (source, _) = sock.recvfrom(1024)
+            except OSError:
+                continue
+            # raw sockets include the IP header, ping sockets do not
+            if raw:
+                packet = packet[(packet[0] & 0x0F) * 4 :]
+            if packet and packet[0] == ICMP_ECHO_REPLY and source in wanted:
+                alive.add(source)
+
+    try:
+        for sequence, address in enumerate(addresses):
+            if limiter:
+                receive(limiter.reserve(address))
+            # replies are matched by source address, the sequence just wraps
+            sequence &= 0xFFFF
+            header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, sequence)
+            packet = header[:2] + struct.pack("!H", checksum(header)) + header[4:]
+            for attempt in range(ICMP_SEND_RETRIES + 1):
+                try:
+                    sock.sendto(packet, (address, 0))
+                    break
+                except OSError as e:
+                    if e.errno not in ICMP_RETRY_ERRNOS:
+                        break
+                    # send buffer full, back off and try again
+                    receive(ICMP_RETRY_DELAY * 2**attempt)
+        receive(timeout)
+    finally:
+        sock.close()
+    return alive
+
+
+class HostDiscovery:
+    """Concurrent TCP (and optionally ICMP) liveness checks
+
+    concurrency caps the TCP pings in flight, not the hosts, and every ping
+    and echo request waits for limiter (a rateLimiter.RateLimiter) when given
+    """
+
+    def __init__(
+        self,
+        timeout=1.0,
+        ports=DISCOVERY_PORTS,
+        concurrency=256,
+        icmp=True,
+        limiter=None,
+    ):
+        self.timeout = timeout
+        self.ports = ports
+        self.concurrency = concurrency
+        self.icmp = icmp
+        self.limiter = limiter
+
+    async def tcp_ping(self, address, port, semaphore):
+        loop = asyncio.get_running_loop()
+        family = socket.AF_INET6 if address_family(address) == 6 else socket.AF_INET
+        async with semaphore:
+            if self.limiter:
+                await self.limiter.wait_async(address)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            try:
+                await asyncio.wait_for(
+                    loop.sock_connect(sock, (address, port)), self.timeout
+                )
+                return True
+            except asyncio.TimeoutError:
+                return False
+            except OSError as e:
+                # RST = nothing listening, but the host is up
+                return e.errno == errno.ECONNREFUSED
+            finally:
+                sock.close()
+
+    async def host_alive(self, address, semaphore):
+        pings = [
+            asyncio.ensure_future(self.tcp_ping(address, port, semaphore))
+            for port in self.ports
+        ]
+        try:
+            for ping in asyncio.as_completed(pings):
+                if await ping:
+                    return True
+            return False
+        finally:
+            for ping in pings:
+                ping.cancel()
+
+    async def discover_async(self, addresses):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        icmp = None
+        ipv4 = [address for address in addresses if address_family(address) == 4]
+        if self.icmp and ipv4:
+            icmp = loop.run_in_executor(
+                None, icmp_sweep, ipv4, self.timeout, self.limiter
+            )
+
+        checks = await asyncio.gather(
+            *(self.host_alive(address, semaphore) for address in addresses)
+        )
+        alive = {address for address, up in zip(addresses, checks) if up}
+        if icmp is not None:
+            alive |= await icmp
+        return alive
+
+    def discover(self, addresses):
+        addresses = list(dict.fromkeys(addresses))
+        if not addresses:
+            return set()
+        return asyncio.run(self.discover_async(addresses))
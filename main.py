@@ -8,42 +8,268 @@ from PySide6.QtWidgets import (
 )
 import sys
 import signal
+import threading
+import time
 from PySide6.QtCore import Signal, QThread, QTimer, Qt
 from components.sidebar import Sidebar
 from components.results_area import ResultsArea
-from portScanner import PortScanner
+from scanCheckpoint import DEFAULT_CHECKPOINT, ScanCheckpoint
+from scanResults import ScanResultStore, PortStatus
+from scanScheduler import ScanScheduler, parse_targets
 from styles import Styles
 from datetime import datetime
 from components.styleComponents import UIComponents
 
 
+class ResultBatcher:
+    """Coalesces per-port results into lists, flushed by size or age"""
+
+    def __init__(self, flush, max_size=500, interval=0.05):
+        # flush(results, current, total), always called from the flusher
+        # thread (or close()), one call at a time and in order
+        self.flush_callback = flush
+        self.max_size = max_size
+        self.interval = interval
+        self.batch = []
+        self.current = 0
+        self.total = 0
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closed = threading.Event()
+        self.last_flush = time.monotonic()
+        self.flusher = None
+
+    def start(self):
+        # flush slow trickles too, not only when the next result arrives
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+
+    def add(self, result, current, total):
+        # engine thread, never blocks on the flush itself
+        with self.lock:
+            self.batch.append(result)
+            self.current = current
+            self.total = total
+            full = len(self.batch) >= self.max_size
+        if full:
+            self.wake.set()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                batch, self.batch = self.batch, []
+                current, total = self.current, self.total
+                self.last_flush = time.monotonic()
+            if batch:
+                self.flush_callback(batch, current, total)
+
+    def close(self):
+        self.closed.set()
+        self.wake.set()
+        if self.flusher:
+            self.flusher.join()
+        self.flush()
+
+    def _flush_loop(self):
+        while not self.closed.is_set():
+            woken = self.wake.wait(self.interval)
+            self.wake.clear()
+            if woken or time.monotonic() - self.last_flush >= self.interval:
+                self.flush()
+
+
 class ScanThread(QThread):
-    result_ready = Signal(dict)  # single port scan result ready
+    # (results, changes since last scan), object: Qt cannot convert a dict
+    # with tuple keys and would deliver it empty
+    results_ready = Signal(list, object)
     progress_update = Signal(int, int)  # (current, total)
-    scan_finished = Signal(list)
+    rate_update = Signal(float, float)  # (achieved, requested) probes/sec
+    hosts_discovered = Signal(int, int)  # (live, total) hosts
+    targets_unresolved = Signal(list)  # hostnames that did not resolve
+    service_updated = Signal(object)  # fingerprinted OPEN result
+    scan_finished = Signal(object)  # ScanResultStore
+
+    def __init__(
+        self,
+        targets,
+        ports,
+        timeout=1.0,
+        engine="async",
+        concurrency=500,
+        rate=None,
+        host_rate=None,
+        adaptive_timing=False,
+        min_timeout=0.05,
+        discover=False,
+        banners=False,
+        dual_stack=False,
+        output_path=None,
+        checkpoint_path=DEFAULT_CHECKPOINT,
+        history=True,
+        resume=False,
+    ):
+        # the scan engine (asyncio, sockets, ...) and the scan history
+        # (sqlite3) load with the first scan, not at startup
+        from portScanner import PortScanner
+        from scanHistory import DEFAULT_HISTORY
 
-    def __init__(self, target, start_port, end_port, timeout=1.0):
         super().__init__()
-        self.target = target
-        self.start_port = start_port
-        self.end_port = end_port
+        self.targets = targets
+        self.output_path = output_path
+        self.ports = ports
         self.timeout = timeout
-        self.scanner = PortScanner(timeout)
+        self.checkpoint_path = checkpoint_path
+        # every scan is recorded and compared with the previous one
+        self.history_path = DEFAULT_HISTORY if history else None
+        self.resume = resume
+        self.stopped = False
+        # everything needed to start this scan again from the checkpoint
+        self.options = {
+            "timeout": timeout,
+            "engine": engine,
+            "concurrency": concurrency,
+            "rate": rate,
+            "host_rate": host_rate,
+            "adaptive_timing": adaptive_timing,
+            "min_timeout": min_timeout,
+            "discover": discover,
+            "banners": banners,
+            "dual_stack": dual_stack,
+            "output_path": output_path,
+        }
+        self.scanner = PortScanner(
+            timeout,
+            engine=engine,
+            concurrency=concurrency,
+            rate=rate,
+            host_rate=host_rate,
+            adaptive_timing=adaptive_timing,
+            min_timeout=min_timeout,
+            max_timeout=timeout,
+            discover=discover,
+            banners=banners,
+        )
+        self.scanner.discovery_callback = self.hosts_discovered.emit
+        self.scanner.resolve_callback = self.targets_unresolved.emit
+        self.scanner.banner_callback = self.on_fingerprinted
+        self.sink = None
+        self.sink_lock = threading.Lock()
 
     # connects to port scanning logic
     def run(self):
-        def callback(result, current, total):
+        import sqlite3
+        from resultSink import open_sink
+
+        sink = open_sink(self.output_path) if self.output_path else None
+        self.sink = sink
+        scheduler = ScanScheduler(
+            self.targets, self.ports, dual_stack=self.options["dual_stack"]
+        )
+        history, diff = self.open_history(scheduler)
+
+        def flush(results, current, total):
+            nonlocal diff
+            # Stream to disk, off the GUI thread, with banners on OPEN
+            # ports are written once fingerprinted (on_fingerprinted)
+            if sink:
+                if self.scanner.banners:
+                    written = [r for r in results if r["status"] != "OPEN"]
+                else:
+                    written = results
+                with self.sink_lock:
+                    sink.write_batch(written)
+            # Compare against the last scan, {(host, port, family): previous}
+            changes = {}
+            if diff:
+                try:
+                    for change in diff.update(results):
+                        key = (change["host"], change["port"], change["family"])
+                        changes[key] = change["previous"]
+                except sqlite3.Error as e:
+                    print(f"Scan history unavailable: {e}", file=sys.stderr)
+                    diff = None
             # Update results table
-            self.result_ready.emit(result)
+            self.results_ready.emit(results, changes)
             # Update progress bar
             self.progress_update.emit(current, total)
+            # Update achieved vs requested rate
+            if self.scanner.limiter:
+                self.rate_update.emit(
+                    self.scanner.limiter.achieved_rate(), self.scanner.rate or 0.0
+                )
 
-        results = self.scanner.scan_range(
-            self.target, self.start_port, self.end_port, callback
-        )
+        # one signal per 50ms/500 results instead of two per port
+        batcher = ResultBatcher(flush)
+        batcher.start()
+        checkpoint = self.open_checkpoint(scheduler)
+        try:
+            results = self.scanner.scan_targets(
+                scheduler, callback=batcher.add, checkpoint=checkpoint
+            )
+        finally:
+            batcher.close()
+            if sink:
+                sink.close()
+            if checkpoint:
+                # keep it only if there is something left to resume
+                if self.stopped:
+                    checkpoint.close()
+                else:
+                    checkpoint.remove()
+            if history:
+                try:
+                    if diff:
+                        diff.finish(complete=not self.stopped)
+                finally:
+                    history.close()
         self.scan_finished.emit(results)
 
+    def on_fingerprinted(self, result):
+        # banner grabber thread
+        if self.sink:
+            with self.sink_lock:
+                self.sink.write_batch([result])
+        self.service_updated.emit(result)
+
+    def open_checkpoint(self, scheduler):
+        if not self.checkpoint_path:
+            return None
+        try:
+            if self.resume:
+                return ScanCheckpoint.open(self.checkpoint_path)
+            return ScanCheckpoint.create(
+                self.checkpoint_path,
+                scheduler.targets,
+                scheduler.ports,
+                self.options,
+                families=2 if scheduler.dual_stack else 1,
+            )
+        except (OSError, ValueError) as e:
+            # scan still runs, it just cannot be resumed
+            print(f"Checkpoint unavailable: {e}", file=sys.stderr)
+            return None
+
+    def open_history(self, scheduler):
+        # (ScanHistory, ScanDiff), or (None, None) without a history
+        if not self.history_path:
+            return None, None
+        import sqlite3
+        from scanHistory import ScanHistory
+
+        history = None
+        try:
+            history = ScanHistory(self.history_path)
+            return history, history.start_scan(scheduler.targets, scheduler.ports)
+        except (OSError, sqlite3.Error) as e:
+            # scan still runs, it is just not compared or recorded
+            print(f"Scan history unavailable: {e}", file=sys.stderr)
+            if history:
+                history.close()
+            return None, None
+
     def stop(self):
+        self.stopped = True
         self.scanner.stop_scan()
 
 
@@ -51,20 +277,20 @@ class SimplePortScanner(QMainWindow):
     def __init__(self):
         super().__init__()
         self.scan_thread = None
-        self.scan_results = []
+        self.scan_results = ScanResultStore()
         self.show_all_results = True
 
         self.setup_window()
         self.setup_ui()
-        self.apply_styles()
         self.connect_signals()
 
-        self.sidebar.set_scan_state(False)
+        self.sidebar.set_scan_state(False, ScanCheckpoint.exists())
 
     def setup_window(self):
         self.setWindowTitle("Port Scanner")
-        self.setGeometry(100, 100, 800, 600)
-        self.setMinimumSize(600, 500)
+        self.setGeometry(100, 100, 1000, 720)
+        # the sidebar scrolls, so the minimum only has to fit the results
+        self.setMinimumSize(800, 600)
 
     def setup_ui(self):
         main_widget = QWidget()
@@ -90,60 +316,163 @@ class SimplePortScanner(QMainWindow):
         main_layout.addWidget(header)  # Sticky header
         main_layout.addWidget(content_widget)
 
-    def apply_styles(self):
-        self.setStyleSheet(Styles.MAIN_WINDOW)
-        self.centralWidget().setStyleSheet(Styles.MAIN_WIDGET)
-
     def connect_signals(self):
         self.sidebar.stop_clicked.connect(self.on_stop_clicked)
         self.sidebar.scan_clicked.connect(self.on_scan_clicked)
+        self.sidebar.resume_clicked.connect(self.on_resume_clicked)
         self.sidebar.clear_clicked.connect(self.on_clear_clicked)
         self.sidebar.show_all_changed.connect(self.on_show_all_changed)
+        self.sidebar.changes_only_changed.connect(self.on_changes_only_changed)
 
     def on_scan_clicked(self):
-        target = self.sidebar.target_input.text().strip()
+        targets = parse_targets(self.sidebar.target_input.text())
         start_port = self.sidebar.start_port.value()
         end_port = self.sidebar.end_port.value()
         timeout = self.sidebar.timeout_spinbox.value()
-
-        if not target:
+        rate = self.sidebar.rate_spinbox.value()
+        host_rate = self.sidebar.host_rate_spinbox.value()
+        adaptive = self.sidebar.adaptive_checkbox.isChecked()
+        min_timeout = self.sidebar.min_timeout_spinbox.value()
+        discover = self.sidebar.discover_checkbox.isChecked()
+        banners = self.sidebar.banners_checkbox.isChecked()
+        dual_stack = self.sidebar.dual_stack_checkbox.isChecked()
+        output_path = self.sidebar.output_path()
+
+        if not targets:
             QMessageBox.warning(self, "Warning", "Please enter a target!")
             return
-        if start_port > end_port:
+        if self.sidebar.top_port_count() is None and start_port > end_port:
             QMessageBox.warning(
                 self, "Error", "Start port cannot be greater than end port"
             )
             return
+        ports = self.sidebar.selected_ports()
+        if adaptive and min_timeout > timeout:
+            QMessageBox.warning(
+                self, "Error", "Minimum timeout cannot be greater than the timeout"
+            )
+            return
+
+        if output_path:
+            from resultSink import open_sink
+
+            try:
+                open_sink(output_path).close()
+            except (OSError, ValueError) as e:
+                QMessageBox.warning(self, "Error", f"Cannot write results: {e}")
+                return
+
+        self.start_scan_thread(
+            ScanThread(
+                targets,
+                ports,
+                timeout,
+                rate=rate,
+                host_rate=host_rate,
+                adaptive_timing=adaptive,
+                min_timeout=min_timeout,
+                discover=discover,
+                banners=banners,
+                dual_stack=dual_stack,
+                output_path=output_path,
+            )
+        )
+
+        if len(targets) > 1:
+            self.results_area.info_text_area.append(f"Targets: {len(targets)} hosts")
+        if self.sidebar.top_port_count() is None:
+            self.results_area.info_text_area.append(
+                f"Port Range: {start_port} - {end_port}"
+            )
+        else:
+            self.results_area.info_text_area.append(
+                f"Ports: {self.sidebar.port_profile.currentText()}"
+            )
+        if adaptive:
+            self.results_area.info_text_area.append(
+                f"Timeout: adaptive {min_timeout:.3f}s - {timeout:.3f}s"
+            )
+        else:
+            self.results_area.info_text_area.append(f"Timeout: {timeout:.3f}s")
+        if rate or host_rate:
+            self.results_area.info_text_area.append(
+                f"Rate limit: {rate or 'unlimited'}/s, "
+                f"{host_rate or 'unlimited'}/s per host"
+            )
+        if banners:
+            self.results_area.info_text_area.append("Banner grabbing: on")
+        if dual_stack:
+            self.results_area.info_text_area.append("Address families: IPv4 + IPv6")
+        self.results_area.info_text_area.append(
+            "Started at: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+        mode_text = (
+            "Show All Results" if self.show_all_results else "Show Open Ports Only"
+        )
+        self.results_area.info_text_area.append(f"Mode: {mode_text}")
+
+    def on_resume_clicked(self):
+        # picks up the last stopped scan with its original settings
+        try:
+            checkpoint = ScanCheckpoint.open(DEFAULT_CHECKPOINT)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Cannot resume scan: {e}")
+            self.sidebar.set_scan_state(False, False)
+            return
+        config = checkpoint.config
+        done = checkpoint.done_count()
+        total = checkpoint.total
+        checkpoint.close()
+
+        self.start_scan_thread(
+            ScanThread(
+                config["targets"], config["ports"], resume=True, **config["options"]
+            )
+        )
+        self.results_area.info_text_area.append(
+            f"Resuming scan: {done} / {total} already done, "
+            f"{len(config['targets'])} hosts x {len(config['ports'])} ports"
+        )
+        self.results_area.info_text_area.append(
+            "Started at: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
 
+    def start_scan_thread(self, scan_thread):
         # ensure checkbox state is read
         self.show_all_results = self.sidebar.checkbox_state()
+        self.results_area.set_show_all(self.show_all_results)
 
         # reset
         self.results_area.reset_ui()
-        self.scan_results = []
+        self.scan_results = ScanResultStore()
 
         self.sidebar.set_scan_state(True)
 
-        self.scan_thread = ScanThread(target, start_port, end_port, timeout)
-        self.scan_thread.result_ready.connect(self.on_results_ready)
+        self.scan_thread = scan_thread
+        self.scan_thread.results_ready.connect(self.on_results_ready)
         self.scan_thread.progress_update.connect(self.on_progress_update)
+        self.scan_thread.rate_update.connect(self.results_area.set_rate)
+        self.scan_thread.hosts_discovered.connect(self.on_hosts_discovered)
+        self.scan_thread.targets_unresolved.connect(self.on_targets_unresolved)
+        self.scan_thread.service_updated.connect(self.results_area.update_service)
         self.scan_thread.scan_finished.connect(self.on_scan_finished)
         self.scan_thread.start()
+        self.results_area.metrics_panel.attach(self.scan_thread.scanner.metrics)
 
+    def on_hosts_discovered(self, live, total):
+        self.results_area.info_text_area.append(f"Live hosts: {live} / {total}")
+
+    def on_targets_unresolved(self, targets):
         self.results_area.info_text_area.append(
-            f"Port Range: {start_port} - {end_port}"
-        )
-        self.results_area.info_text_area.append(f"Timeout: {timeout:.3f}s")
-        self.results_area.info_text_area.append(
-            "Started at: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            f"Could not resolve, skipped: {', '.join(targets)}"
         )
-        mode_text = (
-            "Show All Results" if self.show_all_results else "Show Open Ports Only"
-        )
-        self.results_area.info_text_area.append(f"Mode: {mode_text}")
 
     def on_show_all_changed(self, state):
-        self.show_all_results = state == Qt.Checked
+        self.show_all_results = Qt.CheckState(state) == Qt.Checked
+        self.results_area.set_show_all(self.show_all_results)
+
+    def on_changes_only_changed(self, state):
+        self.results_area.set_changes_only(Qt.CheckState(state) == Qt.Checked)
 
     def on_stop_clicked(self):
         if self.scan_thread and self.scan_thread.isRunning():
@@ -151,45 +480,51 @@ class SimplePortScanner(QMainWindow):
 
             # reset UI state
             self.results_area.set_progress(0)
-            self.sidebar.set_scan_state(False)
+            self.sidebar.set_scan_state(False, True)
 
             QMessageBox.warning(self, "Information", "SCAN STOPPED!")
 
     def on_clear_clicked(self):
         self.results_area.reset_ui()
-        self.scan_results = []
-        self.sidebar.set_scan_state(False)
+        self.scan_results = ScanResultStore()
+        self.sidebar.set_scan_state(False, ScanCheckpoint.exists())
         self.results_area.set_progress(0)
-        self.results_area.results_table.setRowCount(1)
 
-    def on_results_ready(self, result):
-        # individual scan results
-        self.scan_results.append(result)
-        self.results_area.add_scan_result(result, self.show_all_results)
-        QApplication.processEvents()
+    def on_results_ready(self, results, changes):
+        # batch of scan results, the table model keeps its own compact copy
+        self.results_area.add_scan_results(results, changes)
 
     def on_progress_update(self, current, total):
         progress = (current / total) * 100
         self.results_area.set_progress(int(progress))
 
     def on_scan_finished(self, results):
-        self.sidebar.set_scan_state(False)
+        self.sidebar.set_scan_state(False, ScanCheckpoint.exists())
+        self.results_area.metrics_panel.detach()
 
-        summary = []
-        open_ports = [r for r in results if r["status"] == "OPEN"]
-        closed_ports = [r for r in results if r["status"] == "CLOSED"]
-        error_ports = [r for r in results if r["status"] == "ERROR"]
+        self.scan_results = results
+        counts = results.summary()
 
-        summary.append(f"Open ports: {len(open_ports)}")
-        summary.append(f"Closed ports: {len(closed_ports)}")
-        summary.append(f"Error ports: {len(error_ports)}")
-        summary.append(f"Total scanned: {len(results)}")
+        summary = []
+        summary.append(f"Open ports: {counts['OPEN']}")
+        summary.append(f"Closed ports: {counts['CLOSED']}")
+        if counts["FILTERED"]:
+            summary.append(f"Filtered ports: {counts['FILTERED']}")
+        summary.append(f"Error ports: {counts['ERROR']}")
+        summary.append(f"Total scanned: {counts['TOTAL']}")
+        if self.results_area.results_model is not None:
+            opened, closed, other = self.results_area.results_model.change_counts()
+            summary.append(
+                f"Changes since last scan: {opened + closed + other} "
+                f"({opened} opened, {closed} closed)"
+            )
 
-        if open_ports:
+        if counts["OPEN"]:
             summary.append("\nOPEN PORTS FOUND:")
-            for port in open_ports:
+            for row in results.rows_with_status(PortStatus.OPEN):
                 summary.append(
-                    f"  Port {port['port']}: {port['service']} - {port['response_time']}"
+                    f"  {results.label(row)} port {results.port(row)}: "
+                    f"{results.service(row)} - {results.response_time(row)}"
                 )
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.results_area.info_text_area.append(f"Completed at: {timestamp}")
@@ -219,13 +554,21 @@ class SimplePortScanner(QMainWindow):
             event.accept()
 
 
+def create_app(argv):
+    app = QApplication(argv)
+    app.setApplicationName("Port Scanner")
+    # one stylesheet for the whole app, set before any widget exists so
+    # every widget is polished once
+    app.setStyleSheet(Styles.APPLICATION)
+    return app, SimplePortScanner()
+
+
 def main():
     try:
-        app = QApplication(sys.argv)
-        app.setApplicationName("Port Scanner")
-
-        window = SimplePortScanner()
+        app, window = create_app(sys.argv)
         window.show()
+        # results table and summary are built once the event loop is running
+        QTimer.singleShot(0, window.results_area.build_deferred)
 
         # if this OS supports SIGINT
         if hasattr(signal, "SIGINT"):
@@ -1,91 +1,845 @@
+import asyncio
+import errno
+import itertools
+import os
+import queue
+import selectors
+import signal
 import socket
 import time
-from components.commonPorts import COMMON_PORTS
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from adaptiveTiming import AdaptiveTiming
+from rateLimiter import RateLimiter
+from scanResults import ScanResultStore
+from scanScheduler import ScanScheduler, address_family
+from scanMetrics import ScanMetrics
+from serviceRegistry import service_name
+
+try:
+    import resource  # unix only
+except ImportError:
+    resource = None
 
 """
 Port Scanner for network port discovery
-TCP Connect Scanning (similar to Nmap -sT) 
+TCP Connect Scanning (similar to Nmap -sT)
 Completes full TCP handshake (SYN, SYN-ACK, ACK)
+
+scan_targets takes many hosts/ports (see scanScheduler), scan_range is
+the single target, contiguous range shortcut
+
+Engines:
+  sequential - one blocking connect at a time
+  async      - asyncio, many non-blocking connects in flight at once
+  threads    - blocking connects on a thread pool, worker count adapts
+               to connect latency and error rate
+  processes  - work split into shards, each run by the async engine in
+               its own process, results merged back through one queue
+  syn        - half-open raw socket scan (Nmap -sS), see synScanner
+  udp        - UDP probes with protocol payloads (Nmap -sU), see udpScanner
+
+With banners=True every OPEN port is also fingerprinted (bannerGrabber)
+while the scan goes on, the service column then holds "Name version".
+Modules only some engines need are imported when that engine runs.
 """
 
+ENGINES = ("sequential", "async", "threads", "processes", "syn", "udp")
+
+# results sent from shard processes in chunks to keep pickling cheap
+SHARD_BATCH_SIZE = 256
+SHARD_BATCH_INTERVAL = 0.05
+
+# connect errnos that mean the probe timed out without any reply
+TIMEOUT_ERRNOS = {errno.EAGAIN, errno.EWOULDBLOCK, errno.ETIMEDOUT}
+
+# a router said the host or network cannot be reached
+UNREACHABLE_ERRNOS = {errno.EHOSTUNREACH, errno.ENETUNREACH}
+
+# a non-blocking connect_ex() still waiting for the handshake
+CONNECT_PENDING_ERRNOS = {errno.EINPROGRESS, errno.EALREADY}
+
+# out of sockets/buffers, the probe never left the box and should be retried
+RESOURCE_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.EADDRNOTAVAIL}
+
+# resource errors one probe may hit before it is reported as an error
+MAX_RESOURCE_RETRIES = 20
+
+SOCKET_FAMILIES = {4: socket.AF_INET, 6: socket.AF_INET6}
+
+# async connects timed less precisely than this (s, or a tenth of the RTT)
+# get no latency rather than one inflated by the event loop being busy
+RTT_TOLERANCE = 0.001
+
+
+class ProbeSelector(selectors.DefaultSelector):
+    """Default selector that notes when and how blindly its last poll returned
+
+    polled is when the last poll returned, connect_async times a completed
+    connect up to there rather than to when its callback got to run behind
+    everything else that poll woke up. blind is how long the loop had not
+    been polling before it, 0 when the poll had to wait, so every event it
+    returned happened just now. Otherwise the events piled up somewhere in
+    those blind seconds and their timing is only known that closely.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.polled = time.time()
+        self.blind = 0.0
+
+    def select(self, timeout=None):
+        # a non-blocking poll first tells events that were already waiting
+        # from ones that arrive while this poll waits
+        entered = time.time()
+        events = super().select(0)
+        if events or timeout == 0:
+            self.blind = entered - self.polled
+        else:
+            events = super().select(timeout)
+            self.blind = 0.0
+        self.polled = time.time()
+        return events
+
+
+class AdaptiveConcurrency:
+    """AIMD controller for the number of probes in flight"""
+
+    def __init__(self, initial=32, minimum=4, maximum=500, window=64):
+        self.minimum = max(1, min(minimum, maximum))
+        self.maximum = maximum
+        self.limit = max(self.minimum, min(initial, maximum))
+        self.window = window
+        self.baseline = None  # best average latency seen so far
+        self.last_refused_rate = 0.0
+        self._reset_window()
+
+    def _reset_window(self):
+        self.samples = 0
+        self.replies = 0  # probes with a latency sample, timeouts have none
+        self.latency_sum = 0.0
+        self.errors = 0
+        self.refused = 0
+
+    def record(self, latency, code):
+        # called once per finished probe with its errno (0 = connected)
+        if code in RESOURCE_ERRNOS:
+            # hard limit of the box, back off immediately
+            self.limit = max(self.minimum, self.limit // 2)
+            self._reset_window()
+            return
+
+        self.samples += 1
+        if code not in TIMEOUT_ERRNOS:
+            # a timeout's latency is just the timeout, filtered ports would
+            # look like congestion
+            self.replies += 1
+            self.latency_sum += latency
+        if code == errno.ECONNREFUSED:
+            self.refused += 1
+        elif code != 0 and code not in TIMEOUT_ERRNOS:
+            self.errors += 1
+
+        if self.samples >= self.window:
+            self._adjust()
+
+    def _adjust(self):
+        average = self.latency_sum / self.replies if self.replies else None
+        error_rate = self.errors / self.samples
+        refused_rate = self.refused / self.samples
+        if average is not None and (self.baseline is None or average < self.baseline):
+            self.baseline = average
+
+        congested = (
+            error_rate > 0.05
+            or (average is not None and average > self.baseline * 2 + 0.005)
+            # a sudden wave of RSTs usually means a firewall started rate limiting
+            or refused_rate - self.last_refused_rate > 0.5
+        )
+        if congested:
+            self.limit = max(self.minimum, int(self.limit * 0.75))
+        else:
+            self.limit = min(self.maximum, self.limit + max(1, self.limit // 8))
+
+        self.last_refused_rate = refused_rate
+        self._reset_window()
+
 
 class PortScanner:
-    def __init__(self, timeout=1.0):
-        self.results = []
+    def __init__(
+        self,
+        timeout=1.0,
+        engine="sequential",
+        concurrency=500,
+        processes=None,
+        rate=None,
+        host_rate=None,
+        adaptive_timing=False,
+        min_timeout=0.05,
+        max_timeout=None,
+        unreachable_limit=5,
+        discover=False,
+        banners=False,
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown scan engine: {engine}")
+        self.results = ScanResultStore()
         self.is_scanning = False
         self.timeout = timeout
+        self.engine = engine
+        self.protocol = "udp" if engine == "udp" else "tcp"
+        self.concurrency = max(1, int(concurrency))
+        self.processes = processes or os.cpu_count() or 1
+        # probes/sec caps, None = unlimited
+        self.rate = rate or None
+        self.host_rate = host_rate or None
+        self.limiter = RateLimiter(rate, host_rate) if rate or host_rate else None
+        # per-host RTT based timeouts, timeout is the starting value
+        self.adaptive_timing = adaptive_timing
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout or timeout
+        self.timing = None
+        # set while the async engine runs, see ProbeSelector
+        self.selector = None
+        if adaptive_timing:
+            self.timing = AdaptiveTiming(timeout, min_timeout, self.max_timeout)
+        # consecutive unreachable errors before the rest of an address is
+        # skipped, 0 disables the early abort
+        self.unreachable_limit = unreachable_limit
+        self.unreachable = {}
+        self.dead_hosts = set()
+        # ping sweep first, only live hosts get port scanned
+        self.discover = discover
+        self.discovery_callback = None  # called with (live, total) hosts
+        # called with the targets dropped because they did not resolve
+        self.resolve_callback = None
+        self.addresses = {}  # target -> address, from the scheduler
+        # fingerprint OPEN ports, banner_callback gets each result once its
+        # service is known (from the grabber's thread). Banners are TCP
+        # only, UDP open ports are reported by the scan itself
+        self.banners = banners and self.protocol == "tcp"
+        self.banner_callback = None
+        self.grabber = None
+        self.fingerprints = []
+        self.open_rows = {}
+        self.completed = 0
+        self.total = 0
+        self.checkpoint = None
+        # live counters for progress displays, see scanMetrics
+        self.metrics = ScanMetrics()
+        self._stop_event = None
 
-    def scan_single_port(self, target, port, timeout=None):
-        if timeout is None:
-            timeout = self.timeout
+    def scan_single_port(self, target, port, timeout=None, host=None):
+        # host is the label reported in the result, defaults to target
+        if host is None:
+            host = target
+        family = address_family(target)
         try:
-            # AF_INET = IPv4
-            # SOCK_STREAM = TCP
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
+            result, start_time, end_time = self.connect_with_retries(
+                target, port, timeout
+            )
+            return self.build_result(host, port, result, start_time, end_time, target)
 
+        except socket.gaierror:
+            # invalid target
+            return self.error_result(host, port, "hostname error", family)
+        except OSError as e:
+            # socket() itself failed, e.g. out of descriptors
+            self.metrics.connect_result(e.errno or -1)
+            return self.error_result(host, port, str(e), family)
+        except Exception as e:
+            return self.error_result(host, port, str(e), family)
+
+    def connect(self, target, port, timeout):
+        # AF_INET = IPv4, AF_INET6 = IPv6
+        # SOCK_STREAM = TCP
+        family = SOCKET_FAMILIES[address_family(target)]
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
             start_time = time.time()
             # attempt connection to remove server with TCP handshake
             result = sock.connect_ex((target, port))
             end_time = time.time()
-
+        finally:
             # close with FIN packets
             sock.close()
+        return result, start_time, end_time
 
-            # result = 0 means connection successful (open port accepting connections)
-            if result == 0:
-                response_time = round((end_time - start_time) * 1000, 2)  # milliseconds
-                return {
-                    "port": port,
-                    "status": "OPEN",
-                    "response_time": f"{response_time}ms",
-                    "service": self.get_port_name(port),
-                }
-            else:
-                return {
-                    "port": port,
-                    "status": "CLOSED",
-                    "response_time": "timeout",
-                    "service": self.get_port_name(port),
-                }
+    def connect_with_retries(self, target, port, timeout=None):
+        # an explicit timeout skips adaptive timing for this probe
+        tries = 0
+        while True:
+            if tries:
+                self.pace(target)
+            result, start_time, end_time = self.connect(
+                target, port, timeout or self.probe_timeout(target)
+            )
+            if timeout or self.observe(target, result, end_time - start_time, tries):
+                return result, start_time, end_time
+            tries += 1
+
+    async def connect_async(self, target, port, timeout):
+        # the clock runs from the connect() call to the poll that reported
+        # the socket writable, end_time is None when that poll came too long
+        # after the reply to say when it arrived (see ProbeSelector)
+        loop = asyncio.get_running_loop()
+        family = SOCKET_FAMILIES[address_family(target)]
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            start_time = time.time()
+            result = sock.connect_ex((target, port))
+            end_time = time.time()
+            if result not in CONNECT_PENDING_ERRNOS:
+                return result, start_time, end_time
+
+            done = loop.create_future()
 
+            def connected():
+                if not done.done():
+                    code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    done.set_result((code, self.completed_at(start_time)))
+
+            loop.add_writer(sock.fileno(), connected)
+            try:
+                result, end_time = await asyncio.wait_for(done, timeout)
+            except asyncio.TimeoutError:
+                result, end_time = errno.ETIMEDOUT, time.time()
+            finally:
+                loop.remove_writer(sock.fileno())
+            return result, start_time, end_time
+        finally:
+            sock.close()
+
+    def completed_at(self, start_time):
+        # when the connect being reported now completed, None if unknown
+        selector = self.selector
+        if selector is None:
+            return time.time()
+        tolerance = max(RTT_TOLERANCE, (selector.polled - start_time) / 10)
+        if selector.blind > tolerance:
+            return None
+        return selector.polled
+
+    async def scan_single_port_async(self, target, port, timeout=None, host=None):
+        # same as scan_single_port but never blocks the event loop,
+        # target should already be resolved to an IP address
+        if host is None:
+            host = target
+        tries = 0
+        try:
+            while True:
+                if tries and self.limiter:
+                    await self.limiter.wait_async(target)
+                result, start_time, end_time = await self.connect_async(
+                    target, port, timeout or self.probe_timeout(target)
+                )
+                elapsed = None if end_time is None else end_time - start_time
+                if timeout or self.observe(target, result, elapsed, tries):
+                    break
+                tries += 1
         except socket.gaierror:
-            # invalid target
-            return {
-                "port": port,
-                "status": "ERROR",
-                "response_time": "hostname error",
-                "service": self.get_port_name(port),
-            }
-        except Exception as e:
-            return {
-                "port": port,
-                "status": "ERROR",
-                "response_time": str(e),
-                "service": self.get_port_name(port),
-            }
+            return self.error_result(host, port, "hostname error")
+        except OSError as e:
+            # socket() itself failed, e.g. out of descriptors
+            self.metrics.connect_result(e.errno or -1)
+            return self.error_result(host, port, str(e), address_family(target))
+
+        return self.build_result(host, port, result, start_time, end_time, target)
+
+    def probe_timeout(self, address):
+        if self.timing:
+            return self.timing.timeout(address)
+        return self.timeout
+
+    def observe(self, address, result, elapsed, tries):
+        # feeds adaptive timing, returns False when the probe should be resent
+        if not self.timing:
+            return True
+        if result in (0, errno.ECONNREFUSED):
+            # SYN-ACK or RST, either way a real round trip, elapsed is None
+            # when it was not timed precisely enough to learn from
+            if elapsed is not None:
+                self.timing.record(address, elapsed, retransmitted=tries > 0)
+            return True
+        if result in TIMEOUT_ERRNOS and tries < self.timing.retries(address):
+            return False
+        return True
+
+    def make_result(self, host, port, status, latency=None, message=None, family=4):
+        # latency is kept as a raw float (ms), formatting happens at display time
+        # family is the IP version the port was probed over
+        return {
+            "host": host,
+            "port": port,
+            "status": status,
+            "latency": latency,
+            "message": message,
+            "service": self.get_port_name(port, self.protocol),
+            "family": family,
+        }
+
+    def build_result(self, host, port, result, start_time, end_time, address=None):
+        # result = 0 means connection successful (open port accepting connections)
+        # ECONNREFUSED = RST came back (closed), silence or ICMP unreachable
+        # means something in between drops the probe (filtered)
+        # address is the IP probed, defaults to host, end_time None = untimed
+        address = address or host
+        family = address_family(address)
+        latency = None if end_time is None else (end_time - start_time) * 1000
+        self.metrics.connect_result(result)
+        if result in UNREACHABLE_ERRNOS:
+            self.note_unreachable(address)
+        elif result in (0, errno.ECONNREFUSED) and address in self.unreachable:
+            # the host answered, the unreachable streak is over
+            del self.unreachable[address]
+
+        if result == 0:
+            status, message = "OPEN", None
+        elif result == errno.ECONNREFUSED:
+            status, message = "CLOSED", None
+        elif result in TIMEOUT_ERRNOS or result in UNREACHABLE_ERRNOS:
+            status, message = "FILTERED", None
+        else:
+            status, message = "ERROR", os.strerror(result)
+        return self.make_result(host, port, status, latency, message, family)
 
-    def get_port_name(self, port):
-        # fetch port name from dictionary
-        return COMMON_PORTS.get(port, "Unknown")
+    def note_unreachable(self, address):
+        # per address, a dual-stack host can be unreachable over one family only
+        count = self.unreachable.get(address, 0) + 1
+        self.unreachable[address] = count
+        if self.unreachable_limit and count >= self.unreachable_limit:
+            self.dead_hosts.add(address)
+
+    def skipped_result(self, host, port, address):
+        # remaining ports of an address that keeps reporting unreachable
+        return self.make_result(
+            host,
+            port,
+            "FILTERED",
+            message="host unreachable",
+            family=address_family(address),
+        )
+
+    def error_result(self, host, port, message, family=4):
+        return self.make_result(host, port, "ERROR", message=message, family=family)
+
+    def get_port_name(self, port, protocol="tcp"):
+        # registered service name, see serviceRegistry
+        return service_name(port, protocol)
 
     def scan_range(self, target, start_port, end_port, callback=None):
         # scan specified range of ports
-        self.results = []
+        scheduler = ScanScheduler([target], range(start_port, end_port + 1))
+        return self.scan_targets(scheduler, callback=callback)
+
+    def scan_targets(self, targets, ports=None, callback=None, checkpoint=None):
+        # targets is a ScanScheduler, or a target spec plus ports for one
+        # checkpoint (ScanCheckpoint) records progress, finished work is skipped
+        if isinstance(targets, ScanScheduler):
+            scheduler = targets
+        else:
+            scheduler = ScanScheduler(targets, ports)
+        self.checkpoint = checkpoint
+        if checkpoint:
+            scheduler.resume_from(checkpoint)
+
+        self.results = ScanResultStore()
         self.is_scanning = True
+        self.unreachable = {}
+        self.dead_hosts = set()
+        self.completed = 0
+        scheduler.resolve()
+        self.addresses = scheduler.addresses
+        if scheduler.unresolved and self.resolve_callback:
+            self.resolve_callback(list(scheduler.unresolved))
+        if self.discover:
+            self.discover_hosts(scheduler)
+        self.total = max(0, scheduler.total)
+        self.metrics.reset(self.total)
+        if self.banners:
+            self.start_banners()
+
+        try:
+            self._run_engine(scheduler, callback)
+        finally:
+            if self.grabber:
+                self.finish_banners()
+        self.is_scanning = False
+        return self.results
+
+    def run_async(self, coro):
+        # asyncio.run() on a loop whose selector notes when each poll returned
+        selector = self.selector = ProbeSelector()
+        try:
+            with asyncio.Runner(
+                loop_factory=lambda: asyncio.SelectorEventLoop(selector)
+            ) as runner:
+                return runner.run(coro)
+        finally:
+            self.selector = None
+
+    def _run_engine(self, scheduler, callback):
+        if self.engine == "async":
+            self.run_async(self._scan_async(scheduler, callback))
+        elif self.engine == "threads":
+            self._scan_threads(scheduler, callback)
+        elif self.engine == "processes":
+            self._scan_processes(scheduler, callback)
+        elif self.engine == "syn":
+            from synScanner import SynScanner
+
+            SynScanner(self).scan(scheduler, callback)
+        elif self.engine == "udp":
+            from udpScanner import UdpScanner
+
+            UdpScanner(self).scan(scheduler, callback)
+        else:
+            self._scan_sequential(scheduler, callback)
 
-        for port in range(start_port, end_port + 1):
+    def start_banners(self):
+        from bannerGrabber import BannerGrabber
+
+        self.fingerprints = []
+        self.open_rows = {}
+        self.grabber = BannerGrabber(
+            callback=self._fingerprinted, connect_timeout=max(self.timeout, 1.0)
+        ).start()
+
+    def _fingerprinted(self, result):
+        # grabber thread, the store is only touched in finish_banners
+        self.fingerprints.append(result)
+        if self.banner_callback:
+            self.banner_callback(result)
+
+    def finish_banners(self):
+        # a stopped scan drops the fingerprints still in progress
+        self.grabber.close(cancel=not self.is_scanning)
+        self.grabber = None
+        for result in self.fingerprints:
+            row = self.open_rows.get(
+                (result["host"], result["port"], result["family"])
+            )
+            if row is not None:
+                self.results.set_service(row, result["service"])
+        self.fingerprints = []
+        self.open_rows = {}
+
+    def discover_hosts(self, scheduler):
+        from hostDiscovery import HostDiscovery
+
+        addresses = [
+            address
+            for target in scheduler.targets
+            for address in scheduler.addresses[target]
+        ]
+        discovery = HostDiscovery(
+            timeout=self.max_timeout,
+            concurrency=self.concurrency,
+            limiter=self.limiter,
+        )
+        live = discovery.discover(addresses)
+        scheduler.retain(live)
+        if self.discovery_callback:
+            self.discovery_callback(len(live), len(set(addresses)))
+
+    def pace(self, address):
+        # blocks until the rate limiter allows the next probe to address
+        if self.limiter:
+            self.limiter.wait(address)
+
+    def _record(self, result, callback):
+        row = self.results.append(result)
+        if self.grabber and result["status"] == "OPEN":
+            family = result["family"]
+            self.open_rows[(result["host"], result["port"], family)] = row
+            address = next(
+                (
+                    address
+                    for address in self.addresses.get(result["host"], ())
+                    if address_family(address) == family
+                ),
+                None,
+            )
+            self.grabber.submit(result, address)
+        if self.checkpoint:
+            self.checkpoint.mark(result)
+        self.completed += 1
+        self.metrics.record(result)
+        if callback:
+            callback(result, self.completed, self.total)
+
+    def _scan_sequential(self, work, callback):
+        for host, address, port in work:
             if not self.is_scanning:
                 break
 
-            result = self.scan_single_port(target, port)
-            self.results.append(result)
+            if address is None:
+                result = self.error_result(host, port, "hostname error")
+            elif address in self.dead_hosts:
+                result = self.skipped_result(host, port, address)
+            else:
+                self.pace(address)
+                self.metrics.in_flight = 1
+                result = self.scan_single_port(address, port, host=host)
+                self.metrics.in_flight = 0
+            self._record(result, callback)
 
-            if callback:
-                callback(result, port - start_port + 1, end_port - start_port + 1)
+    async def _scan_async(self, work, callback):
+        work = iter(work)
 
-        self.is_scanning = False
-        return self.results
+        async def worker():
+            # every worker pulls the next item from the shared iterator,
+            # so at most `concurrency` connects are in flight at once
+            for host, address, port in work:
+                if self.stop_requested():
+                    break
+                if address is None:
+                    result = self.error_result(host, port, "hostname error")
+                elif address in self.dead_hosts:
+                    result = self.skipped_result(host, port, address)
+                else:
+                    if self.limiter:
+                        await self.limiter.wait_async(address)
+                    self.metrics.in_flight += 1
+                    result = await self.scan_single_port_async(
+                        address, port, host=host
+                    )
+                    self.metrics.in_flight -= 1
+                self._record(result, callback)
+
+        workers = max(1, min(self.concurrency, self.total))
+        raise_fd_limit(workers + 64)
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    def _probe_blocking(self, item):
+        # thread pool task, returns (item, result, errno, elapsed)
+        # result is None when the probe should be retried
+        host, address, port = item
+        if address is None:
+            return item, self.error_result(host, port, "hostname error"), 0, 0.0
+        if address in self.dead_hosts:
+            return item, self.skipped_result(host, port, address), 0, 0.0
+        self.pace(address)
+        try:
+            code, start_time, end_time = self.connect_with_retries(address, port)
+        except OSError as e:
+            # socket() itself failed, counted here as build_result never sees it
+            self.metrics.connect_result(e.errno or -1)
+            if e.errno in RESOURCE_ERRNOS:
+                return item, None, e.errno, 0.0
+            result = self.error_result(host, port, str(e), address_family(address))
+            return item, result, e.errno, 0.0
+        if code in RESOURCE_ERRNOS:
+            # connect_ex reports these as a return code, not an exception,
+            # every retried attempt counts
+            self.metrics.connect_result(code)
+            return item, None, code, 0.0
+        result = self.build_result(host, port, code, start_time, end_time, address)
+        return item, result, code, end_time - start_time
+
+    def _scan_threads(self, work, callback):
+        work = iter(work)
+        retry = deque()
+
+        self.controller = AdaptiveConcurrency(
+            maximum=max(1, min(self.concurrency, self.total))
+        )
+        raise_fd_limit(self.controller.maximum + 64)
+
+        attempts = {}  # item -> resource errors so far
+
+        def next_item():
+            if retry:
+                return retry.popleft()
+            return next(work, None)
+
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.controller.maximum) as pool:
+            exhausted = False
+            while True:
+                # top up to the current adaptive limit
+                while (
+                    self.is_scanning
+                    and not exhausted
+                    and len(in_flight) < self.controller.limit
+                ):
+                    item = next_item()
+                    if item is None:
+                        exhausted = True
+                        break
+                    in_flight.add(pool.submit(self._probe_blocking, item))
+                self.metrics.in_flight = len(in_flight)
+
+                if not in_flight:
+                    if retry and self.is_scanning:
+                        # out of descriptors with nothing in flight, give
+                        # the rest of the box a moment before retrying
+                        time.sleep(0.05)
+                        exhausted = False
+                        continue
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, result, code, elapsed = future.result()
+                    self.controller.record(elapsed, code)
+                    if result is None:
+                        attempts[item] = attempts.get(item, 0) + 1
+                        if attempts[item] <= MAX_RESOURCE_RETRIES:
+                            retry.append(item)
+                            exhausted = False
+                            continue
+                        # not a passing shortage, report it
+                        del attempts[item]
+                        host, address, port = item
+                        result = self.error_result(
+                            host, port, os.strerror(code), address_family(address)
+                        )
+                    elif item in attempts:
+                        del attempts[item]
+                    self._record(result, callback)
+
+    def _scan_processes(self, scheduler, callback):
+        shards = max(1, min(self.processes, self.total))
+        per_shard = max(1, self.concurrency // shards)
+        # every shard sees every host, so both rate caps are split evenly
+        options = {
+            "timeout": self.timeout,
+            "engine": "async",
+            "concurrency": per_shard,
+            "rate": self.rate / shards if self.rate else None,
+            "host_rate": self.host_rate / shards if self.host_rate else None,
+            "adaptive_timing": self.adaptive_timing,
+            "min_timeout": self.min_timeout,
+            "max_timeout": self.max_timeout,
+            "unreachable_limit": self.unreachable_limit,
+        }
+
+        import multiprocessing
+
+        # spawn, forking a process that runs Qt threads is not safe
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        self._stop_event = context.Event()
+        if not self.is_scanning:
+            # stopped before the event existed
+            self._stop_event.set()
+        workers = [
+            context.Process(
+                target=_scan_shard,
+                args=(
+                    scheduler.targets,
+                    scheduler.ports,
+                    scheduler.addresses,
+                    scheduler.checkpoint,
+                    shard,
+                    shards,
+                    options,
+                    results,
+                    self._stop_event,
+                ),
+                daemon=True,
+            )
+            for shard in range(shards)
+        ]
+        for worker in workers:
+            worker.start()
+
+        # probes run in the shards, only results come back here
+        self.metrics.in_flight = None
+        running = shards
+        while running:
+            try:
+                batch = results.get(timeout=0.1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    break
+                continue
+
+            # None marks the end of one shard
+            if batch is None:
+                running -= 1
+                continue
+            for result in batch:
+                self._record(result, callback)
+
+        for worker in workers:
+            worker.join()
+        self._stop_event = None
 
     def stop_scan(self):
         self.is_scanning = False
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    def stop_requested(self):
+        # processes engine shards poll the parent's stop event, a thread
+        # blocked in Event.wait() would outlive the shard as a waiter and
+        # hang the parent's set()
+        if self._stop_event is not None and self._stop_event.is_set():
+            self.is_scanning = False
+        return not self.is_scanning
+
+
+def _scan_shard(
+    targets, ports, addresses, checkpoint, shard, shards, options, results, stop
+):
+    # runs in a child process, scans every `shards`-th work item
+    # ^C reaches the whole process group, the parent decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    scheduler = ScanScheduler(targets, ports)
+    scheduler.addresses = addresses
+    if checkpoint:
+        scheduler.resume_from(checkpoint)
+    work = itertools.islice(scheduler, shard, None, shards)
+
+    scanner = PortScanner(**options)
+    scanner.results = _DiscardStore()
+    scanner.is_scanning = True
+    scanner.total = len(range(shard, scheduler.total, shards))
+
+    # stop requests from the parent, polled by the workers
+    scanner._stop_event = stop
+
+    batch = []
+    last_flush = time.monotonic()
+
+    def callback(result, current, total):
+        nonlocal batch, last_flush
+        batch.append(result)
+        now = time.monotonic()
+        if len(batch) >= SHARD_BATCH_SIZE or now - last_flush >= SHARD_BATCH_INTERVAL:
+            results.put(batch)
+            batch = []
+            last_flush = now
+
+    try:
+        scanner.run_async(scanner._scan_async(work, callback))
+    finally:
+        if batch:
+            results.put(batch)
+        results.put(None)
+
+
+class _DiscardStore:
+    # shard results are shipped to the parent, no need to keep them
+    def append(self, result):
+        pass
+
+
+def raise_fd_limit(needed):
+    # every in-flight connect holds a file descriptor, bump the soft
+    # limit towards the hard limit when the default (often 1024) is too low
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft >= needed:
+        return
+    if hard != resource.RLIM_INFINITY:
+        needed = min(needed, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+    except (ValueError, OSError):
+        pass
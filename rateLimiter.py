@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+"""
+Probe pacing shared by every worker of a scan
+Token buckets (implemented as GCRA / virtual scheduling) cap the global
+probe rate and the rate towards each single host. Sending faster than a
+target tolerates trips IDS / SYN flood protection and turns open ports
+into false "CLOSED" results.
+"""
+
+
+class TokenBucket:
+    """rate tokens per second, up to burst tokens saved up"""
+
+    def __init__(self, rate, burst=None):
+        self.interval = 1.0 / rate
+        self.tolerance = self.interval * ((burst or max(1.0, rate / 10)) - 1)
+        self.next_time = 0.0  # theoretical arrival time of the next token
+
+    def earliest(self, now):
+        return max(now, self.next_time - self.tolerance)
+
+    def consume(self, at):
+        self.next_time = max(self.next_time, at) + self.interval
+
+
+class RateLimiter:
+    """Global and per-host probes/sec caps, thread and asyncio safe"""
+
+    def __init__(self, rate=None, host_rate=None, window=1.0):
+        self.rate = rate or None
+        self.host_rate = host_rate or None
+        self.global_bucket = TokenBucket(rate) if self.rate else None
+        self.host_buckets = {}
+        self.lock = threading.Lock()
+
+        # (timestamp, probes sent) samples for the achieved rate
+        self.window = window
+        self.sent = 0
+        self.samples = deque([(time.monotonic(), 0)])
+
+    @property
+    def enabled(self):
+        return self.rate is not None or self.host_rate is not None
+
+    def reserve(self, host):
+        # book the next slot for host, returns how long to wait for it
+        with self.lock:
+            now = time.monotonic()
+            start = now
+            host_bucket = None
+            if self.global_bucket:
+                start = self.global_bucket.earliest(start)
+            if self.host_rate:
+                host_bucket = self.host_buckets.get(host)
+                if host_bucket is None:
+                    host_bucket = self.host_buckets[host] = TokenBucket(
+                        self.host_rate
+                    )
+                start = max(start, host_bucket.earliest(now))
+
+            if self.global_bucket:
+                self.global_bucket.consume(start)
+            if host_bucket:
+                host_bucket.consume(start)
+            self.sent += 1
+            return start - now
+
+    def wait(self, host):
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, host):
+        delay = self.reserve(host)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def achieved_rate(self):
+        # probes/sec over roughly the last `window` seconds
+        with self.lock:
+            now = time.monotonic()
+            self.samples.append((now, self.sent))
+            while len(self.samples) > 2 and now - self.samples[1][0] >= self.window:
+                self.samples.popleft()
+            start_time, start_count = self.samples[0]
+            elapsed = now - start_time
+            if elapsed <= 0:
+                return 0.0
+            return (self.sent - start_count) / elapsed
+
+    def requested_rate(self):
+        return self.rate
@@ -0,0 +1,213 @@
+import csv
+import io
+import json
+import os
+import struct
+import sys
+import time
+from scanResults import PortStatus
+
+"""
+Streaming result output
+Results are appended to disk while the scan runs (JSONL, CSV or a compact
+binary record format), so memory stays flat on huge scans. Writes go
+through a large buffer and are fsync'ed periodically, a crash loses at
+most the data written since the last sync.
+"""
+
+FORMATS = ("jsonl", "csv", "bin")
+
+CSV_FIELDS = ["host", "port", "status", "latency", "message", "service", "family"]
+
+# binary file: magic, then one record per result
+#   u8 host length, u16 port, u8 status, f32 latency (NaN = none),
+#   u16 message length, u8 address family (4/6), u8 service length,
+#   host bytes, message bytes, service bytes
+BINARY_MAGIC = b"PSR1"
+BINARY_RECORD = struct.Struct("<BHBfHBB")
+
+
+class ResultSink:
+    """Base class, subclasses implement encode(), path "-" is stdout"""
+
+    binary = False
+
+    def __init__(self, path, fsync_interval=1.0, buffer_size=1 << 20):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        mode = "ab" if self.binary else "a"
+        encoding = None if self.binary else "utf-8"
+        newline = None if self.binary else ""
+        # stdout is flushed on the same schedule, but pipes cannot be fsync'ed
+        self.stdout = path == "-"
+        if self.stdout:
+            new_file = True
+            path = sys.stdout.fileno()
+        else:
+            new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+            if not new_file:
+                self.check_header(path)
+        self.file = open(
+            path,
+            mode,
+            buffering=buffer_size,
+            encoding=encoding,
+            newline=newline,
+            closefd=not self.stdout,
+        )
+        self.last_sync = time.monotonic()
+        if new_file:
+            self.write_header()
+
+    def write_header(self):
+        pass
+
+    def check_header(self, path):
+        # appending to an existing file, raise ValueError if it does not fit
+        pass
+
+    def encode(self, result):
+        raise NotImplementedError
+
+    def write(self, result):
+        self.file.write(self.encode(result))
+        self.maybe_sync()
+
+    def write_batch(self, results):
+        self.file.write(self.join(self.encode(result) for result in results))
+        self.maybe_sync()
+
+    def join(self, chunks):
+        return (b"" if self.binary else "").join(chunks)
+
+    def maybe_sync(self):
+        now = time.monotonic()
+        if now - self.last_sync >= self.fsync_interval:
+            self.sync()
+            self.last_sync = now
+
+    def sync(self):
+        self.file.flush()
+        if not self.stdout:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlSink(ResultSink):
+    def encode(self, result):
+        return json.dumps(result, separators=(",", ":")) + "\n"
+
+
+class CsvSink(ResultSink):
+    def __init__(self, path, **kwargs):
+        self.buffer = io.StringIO()
+        self.writer = csv.DictWriter(
+            self.buffer, fieldnames=CSV_FIELDS, extrasaction="ignore"
+        )
+        super().__init__(path, **kwargs)
+
+    def write_header(self):
+        self.file.write(",".join(CSV_FIELDS) + "\r\n")
+
+    def check_header(self, path):
+        with open(path, encoding="utf-8", newline="") as f:
+            if f.readline().rstrip("\r\n") != ",".join(CSV_FIELDS):
+                raise ValueError(f"{path} has different CSV columns")
+
+    def encode(self, result):
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.writer.writerow(result)
+        return self.buffer.getvalue()
+
+
+class BinarySink(ResultSink):
+    binary = True
+
+    def write_header(self):
+        self.file.write(BINARY_MAGIC)
+
+    def check_header(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                raise ValueError(f"{path} is not a binary result file")
+
+    def encode(self, result):
+        host = result.get("host", "").encode()
+        message = (result.get("message") or "").encode()
+        # service names and versions are short, the length is one byte
+        service = (result.get("service") or "").encode()[:255]
+        latency = result.get("latency")
+        return (
+            BINARY_RECORD.pack(
+                len(host),
+                result["port"],
+                PortStatus[result["status"]],
+                float("nan") if latency is None else latency,
+                len(message),
+                result.get("family", 4),
+                len(service),
+            )
+            + host
+            + message
+            + service
+        )
+
+
+def read_binary(path):
+    # yields result dicts back from a BinarySink file
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary result file")
+        while True:
+            header = f.read(BINARY_RECORD.size)
+            if len(header) < BINARY_RECORD.size:
+                return
+            (
+                host_len,
+                port,
+                status,
+                latency,
+                message_len,
+                family,
+                service_len,
+            ) = BINARY_RECORD.unpack(header)
+            host = f.read(host_len).decode()
+            message = f.read(message_len).decode() or None
+            service = f.read(service_len).decode(errors="replace") or None
+            yield {
+                "host": host,
+                "port": port,
+                "status": PortStatus(status).name,
+                "latency": None if latency != latency else latency,
+                "message": message,
+                "service": service,
+                "family": family,
+            }
+
+
+SINKS = {"jsonl": JsonlSink, "csv": CsvSink, "bin": BinarySink}
+
+
+def open_sink(path, format=None, **kwargs):
+    # format defaults to the file extension, JSONL on stdout
+    if format is None and path == "-":
+        format = "jsonl"
+    if format is None:
+        format = os.path.splitext(path)[1].lstrip(".").lower()
+        if format == "json":
+            format = "jsonl"
+    if format not in SINKS:
+        choices = ", ".join(FORMATS)
+        raise ValueError(f"Unknown output format: {format} (use {choices})")
+    return SINKS[format](path, **kwargs)
@@ -0,0 +1,142 @@
+import json
+import mmap
+import os
+import time
+
+"""
+Resumable scans
+A checkpoint is a JSON file with the scan config (targets, ports, options)
+plus a memory-mapped bitmap with one bit per (host, port) work item, set
+once that item has a result. Dual-stack scans keep two bits per item, one
+per address family. Marking a result is a single in-memory bit
+flip, the OS writes pages back and we msync periodically, so checkpointing
+a 65k port x 4096 host space (32 MiB of bitmap) stays cheap. Unset bits are
+the pending work a resumed scan still has to do.
+"""
+
+DEFAULT_CHECKPOINT = os.path.join(
+    os.path.expanduser("~"), ".port_scanner", "last_scan.json"
+)
+
+
+def bitmap_path(path):
+    return path + ".bitmap"
+
+
+def count_bits(data):
+    number = int.from_bytes(data, "little")
+    if hasattr(number, "bit_count"):
+        return number.bit_count()
+    return bin(number).count("1")
+
+
+class ScanCheckpoint:
+    """Completed (host, port) bitmap plus the config needed to resume"""
+
+    def __init__(self, path, config, bitmap_file, bitmap):
+        self.path = path
+        self.config = config
+        self.targets = config["targets"]
+        self.ports = config["ports"]
+        self.families = config.get("families", 1)
+        self.target_index = {target: i for i, target in enumerate(self.targets)}
+        self.port_index = {port: i for i, port in enumerate(self.ports)}
+        self.bitmap_file = bitmap_file
+        self.bitmap = bitmap
+        self.sync_interval = 2.0
+        self.last_sync = time.monotonic()
+
+    @classmethod
+    def create(
+        cls, path, targets, ports, options=None, sync_interval=2.0, families=1
+    ):
+        # families=2 for dual-stack scans, IPv4 and IPv6 are tracked apart
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        config = {
+            "targets": list(targets),
+            "ports": list(ports),
+            "families": families,
+            "options": options or {},
+            "created": time.time(),
+        }
+        bits = len(config["targets"]) * len(config["ports"]) * families
+        size = max(1, (bits + 7) // 8)
+        with open(bitmap_path(path), "wb") as f:
+            f.truncate(size)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        checkpoint = cls.open(path)
+        checkpoint.sync_interval = sync_interval
+        return checkpoint
+
+    @classmethod
+    def open(cls, path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        bitmap_file = open(bitmap_path(path), "r+b")
+        bitmap = mmap.mmap(bitmap_file.fileno(), 0)
+        return cls(path, config, bitmap_file, bitmap)
+
+    @staticmethod
+    def exists(path=DEFAULT_CHECKPOINT):
+        return os.path.exists(path) and os.path.exists(bitmap_path(path))
+
+    def index(self, target, port, family=4):
+        # same port-major order the scheduler uses
+        index = self.port_index[port] * len(self.targets) + self.target_index[target]
+        if self.families == 1:
+            return index
+        return index * 2 + (family == 6)
+
+    def is_done(self, target, port, family=4):
+        try:
+            index = self.index(target, port, family)
+        except KeyError:
+            return False
+        return self.bitmap[index >> 3] & (1 << (index & 7)) != 0
+
+    def frozen(self):
+        # read-only copy of the bitmap as it is now, for deciding what to
+        # skip while this checkpoint keeps being marked (picklable)
+        return ScanCheckpoint(self.path, self.config, None, bytes(self.bitmap))
+
+    def mark(self, result):
+        try:
+            index = self.index(
+                result["host"], result["port"], result.get("family", 4)
+            )
+        except KeyError:
+            return
+        self.bitmap[index >> 3] |= 1 << (index & 7)
+
+        now = time.monotonic()
+        if now - self.last_sync >= self.sync_interval:
+            self.sync()
+            self.last_sync = now
+
+    def done_count(self):
+        return count_bits(self.bitmap)
+
+    @property
+    def total(self):
+        # work items, an upper bound for dual-stack (not every host has both)
+        return len(self.targets) * len(self.ports) * self.families
+
+    def sync(self):
+        if self.bitmap_file:
+            self.bitmap.flush()
+
+    def close(self):
+        if self.bitmap_file and not self.bitmap.closed:
+            self.sync()
+            self.bitmap.close()
+            self.bitmap_file.close()
+
+    def remove(self):
+        # scan finished, nothing left to resume
+        self.close()
+        for name in (self.path, bitmap_path(self.path)):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from scanResults import PortStatus
+
+"""
+Scan history and scan-to-scan diffs
+Every scan is recorded in one SQLite file. The state table holds the last
+known status of every (host, port, family) seen so far, that is the
+baseline a new scan is compared against. The results table is the history,
+it only gets the rows that changed the state (so the first scan of a range
+stores everything, a repeat sweep only what moved), indexed on
+(host, port, time) for per-port timelines.
+
+ScanDiff.update() runs per result batch while the scan goes on: the batch
+goes into a temp table, one join against state finds the changes, which
+are appended to the history and written back to state. Only the changes
+come back to the caller. ERROR results say nothing about the port and are
+never compared or stored.
+"""
+
+DEFAULT_HISTORY = os.path.join(
+    os.path.expanduser("~"), ".port_scanner", "history.sqlite"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    targets TEXT NOT NULL,
+    ports INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    scan_id INTEGER NOT NULL REFERENCES scans (id),
+    host TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    family INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    previous INTEGER,
+    latency REAL,
+    service TEXT,
+    time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_host_port_time ON results (host, port, time);
+CREATE INDEX IF NOT EXISTS results_scan ON results (scan_id);
+CREATE TABLE IF NOT EXISTS state (
+    host TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    family INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    scan_id INTEGER NOT NULL,
+    PRIMARY KEY (host, port, family)
+) WITHOUT ROWID;
+"""
+
+BATCH_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS batch (
+    host TEXT, port INTEGER, family INTEGER, status INTEGER,
+    latency REAL, service TEXT
+);
+CREATE TEMP TABLE IF NOT EXISTS changed (
+    host TEXT, port INTEGER, family INTEGER, status INTEGER, previous INTEGER,
+    latency REAL, service TEXT
+);
+"""
+
+
+def status_name(value):
+    return None if value is None else PortStatus(value).name
+
+
+class ScanHistory:
+    """SQLite result history, thread safe (one connection behind a lock)"""
+
+    def __init__(self, path=DEFAULT_HISTORY):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        # scans record from the batcher and scan threads
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA + BATCH_SCHEMA)
+
+    def start_scan(self, targets, ports):
+        # a ScanDiff recording one new scan
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "INSERT INTO scans (started, targets, ports) VALUES (?, ?, ?)",
+                (time.time(), json.dumps(list(targets)), len(ports)),
+            )
+        return ScanDiff(self, cursor.lastrowid)
+
+    def finish_scan(self, scan_id, complete=True):
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE scans SET finished = ?, complete = ? WHERE id = ?",
+                (time.time(), int(complete), scan_id),
+            )
+
+    def scans(self, limit=20):
+        # most recent first
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, started, finished, complete, targets, ports FROM scans "
+                "ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {
+                "id": scan_id,
+                "started": started,
+                "finished": finished,
+                "complete": bool(complete),
+                "targets": json.loads(targets),
+                "ports": ports,
+            }
+            for scan_id, started, finished, complete, targets, ports in rows
+        ]
+
+    def changes(self, scan_id):
+        # the changes one scan found, as result dicts with "previous"
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT host, port, family, status, previous, latency, service "
+                "FROM results WHERE scan_id = ? "
+                "AND (previous IS NOT NULL OR status = ?)",
+                (scan_id, PortStatus.OPEN),
+            ).fetchall()
+        return [change_result(*row) for row in rows]
+
+    def port_history(self, host, port):
+        # (time, family, status) of every change of one port, oldest first
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT time, family, status FROM results "
+                "WHERE host = ? AND port = ? ORDER BY time",
+                (host, port),
+            ).fetchall()
+        return [(when, family, status_name(status)) for when, family, status in rows]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class ScanDiff:
+    """Feeds one scan's results into the history, returns what changed"""
+
+    def __init__(self, history, scan_id):
+        self.history = history
+        self.scan_id = scan_id
+        self.changed = 0
+
+    def update(self, results):
+        # results are scan result dicts, returns the changed ones as result
+        # dicts with "previous" (None for ports never seen before). Ports
+        # seen for the first time only count as a change when open
+        rows = [
+            (
+                result["host"],
+                result["port"],
+                result.get("family", 4),
+                PortStatus[result["status"]],
+                result.get("latency"),
+                result.get("service"),
+            )
+            for result in results
+            if result["status"] != "ERROR"
+        ]
+        if not rows:
+            return []
+
+        db = self.history.db
+        with self.history.lock, db:
+            db.execute("DELETE FROM batch")
+            db.execute("DELETE FROM changed")
+            db.executemany("INSERT INTO batch VALUES (?, ?, ?, ?, ?, ?)", rows)
+            db.execute(
+                "INSERT INTO changed SELECT b.host, b.port, b.family, b.status, "
+                "s.status, b.latency, b.service FROM batch b LEFT JOIN state s "
+                "ON s.host = b.host AND s.port = b.port AND s.family = b.family "
+                "WHERE s.status IS NULL OR s.status != b.status"
+            )
+            db.execute(
+                "INSERT INTO results SELECT ?, host, port, family, status, "
+                "previous, latency, service, ? FROM changed",
+                (self.scan_id, time.time()),
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO state "
+                "SELECT host, port, family, status, ? FROM changed",
+                (self.scan_id,),
+            )
+            changed = db.execute(
+                "SELECT host, port, family, status, previous, latency, service "
+                "FROM changed WHERE previous IS NOT NULL OR status = ?",
+                (PortStatus.OPEN,),
+            ).fetchall()
+
+        self.changed += len(changed)
+        return [change_result(*row) for row in changed]
+
+    def finish(self, complete=True):
+        self.history.finish_scan(self.scan_id, complete)
+
+
+def change_result(host, port, family, status, previous, latency, service):
+    return {
+        "host": host,
+        "port": port,
+        "status": status_name(status),
+        "latency": latency,
+        "message": None,
+        "service": service,
+        "family": family,
+        "previous": status_name(previous),
+    }
@@ -0,0 +1,114 @@
+import bisect
+import errno
+import threading
+import time
+from collections import Counter, deque
+from scanResults import PortStatus
+
+"""
+Live scan instrumentation
+Engines feed a ScanMetrics through a few cheap hooks: record() for every
+result (already on the single thread that records results), in_flight as
+a plain gauge the engine overwrites, connect_result() for connect errnos
+(the only hook that may run on worker threads, so it takes a lock and
+ignores the common open/closed answers). Readers poll snapshot() at their
+own pace, nothing is pushed per result.
+"""
+
+# RTT histogram bucket upper edges in ms, doubling from 0.125ms to ~4s,
+# the last bucket holds everything slower
+RTT_BUCKETS = tuple(0.125 * 2**i for i in range(16))
+
+# connect results that are normal answers, not errors
+REPLY_CODES = (0, errno.ECONNREFUSED)
+
+
+class ScanMetrics:
+    """Counters, gauges and an RTT histogram for one scan"""
+
+    def __init__(self, rate_window=2.0):
+        self.rate_window = rate_window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, total=0):
+        self.start_time = time.monotonic()
+        self.total = total
+        self.completed = 0
+        self.in_flight = 0  # None when the engine cannot tell (process shards)
+        self.statuses = [0] * len(PortStatus)
+        self.rtt = [0] * (len(RTT_BUCKETS) + 1)
+        self.errors = Counter()  # errno -> count
+        self.samples = deque([(self.start_time, 0)])
+
+    # hooks, called by the engines
+
+    def record(self, result):
+        self.completed += 1
+        status = PortStatus[result["status"]]
+        self.statuses[status] += 1
+        latency = result["latency"]
+        if latency is not None and status in (PortStatus.OPEN, PortStatus.CLOSED):
+            self.rtt[bisect.bisect_left(RTT_BUCKETS, latency)] += 1
+
+    def connect_result(self, code):
+        if code in REPLY_CODES:
+            return
+        with self.lock:
+            self.errors[code] += 1
+
+    # readers
+
+    def rate(self, now=None):
+        # results/sec over the last rate_window seconds of snapshots
+        now = time.monotonic() if now is None else now
+        self.samples.append((now, self.completed))
+        while len(self.samples) > 2 and now - self.samples[1][0] >= self.rate_window:
+            self.samples.popleft()
+        then, completed = self.samples[0]
+        if now <= then:
+            return 0.0
+        return (self.completed - completed) / (now - then)
+
+    def eta(self, rate):
+        remaining = self.total - self.completed
+        if remaining <= 0:
+            return 0.0
+        return remaining / rate if rate else None
+
+    def percentile(self, fraction):
+        # upper edge of the bucket holding the given RTT percentile
+        count = sum(self.rtt)
+        if not count:
+            return None
+        rank = fraction * count
+        seen = 0
+        for edge, bucket in zip(RTT_BUCKETS, self.rtt):
+            seen += bucket
+            if seen >= rank:
+                return edge
+        return float("inf")
+
+    def snapshot(self):
+        now = time.monotonic()
+        rate = self.rate(now)
+        with self.lock:
+            errors = {
+                errno.errorcode.get(code, str(code)): count
+                for code, count in self.errors.most_common()
+            }
+        return {
+            "elapsed": now - self.start_time,
+            "completed": self.completed,
+            "total": self.total,
+            "rate": rate,
+            "eta": self.eta(rate),
+            "in_flight": self.in_flight,
+            "statuses": {
+                status.name: self.statuses[status] for status in PortStatus
+            },
+            "rtt": list(self.rtt),
+            "rtt_p50": self.percentile(0.5),
+            "rtt_p99": self.percentile(0.99),
+            "errors": errors,
+        }
@@ -0,0 +1,185 @@
+import math
+import sys
+from array import array
+from enum import IntEnum
+
+"""
+Compact scan result storage
+Results are kept column-wise in typed arrays (a few bytes per port)
+instead of one dict per port, strings are only built when displayed.
+"""
+
+
+class PortStatus(IntEnum):
+    OPEN = 0
+    CLOSED = 1
+    ERROR = 2
+    FILTERED = 3  # no answer, or an ICMP unreachable
+
+
+def format_response_time(latency, message=None):
+    # latency in ms (None/NaN when there was no answer)
+    if message:
+        return message
+    if latency is None or math.isnan(latency):
+        return "timeout"
+    return f"{round(latency, 2)}ms"
+
+
+class ScanResultStore:
+    """Array-backed columns: host index, port, status, latency, service, family"""
+
+    __slots__ = (
+        "host_ids",
+        "families",
+        "ports",
+        "statuses",
+        "latencies",
+        "service_ids",
+        "hosts",
+        "host_lookup",
+        "services",
+        "service_lookup",
+        "messages",
+    )
+
+    def __init__(self, results=()):
+        self.host_ids = array("I")
+        self.ports = array("H")
+        self.statuses = array("B")
+        self.latencies = array("f")  # ms, NaN when there was no answer
+        self.service_ids = array("H")
+        self.families = array("B")  # 4 or 6
+
+        # interned lookup tables shared by all rows
+        self.hosts = []
+        self.host_lookup = {}
+        self.services = []
+        self.service_lookup = {}
+
+        # free-text errors are rare, keep them sparse
+        self.messages = {}
+
+        self.extend(results)
+
+    @staticmethod
+    def _intern(value, values, lookup):
+        index = lookup.get(value)
+        if index is None:
+            index = len(values)
+            values.append(sys.intern(value))
+            lookup[value] = index
+        return index
+
+    def add(
+        self,
+        host,
+        port,
+        status,
+        latency=None,
+        service="Unknown",
+        message=None,
+        family=4,
+    ):
+        row = len(self.ports)
+        self.host_ids.append(self._intern(host, self.hosts, self.host_lookup))
+        self.ports.append(port)
+        self.statuses.append(PortStatus[status] if isinstance(status, str) else status)
+        self.latencies.append(math.nan if latency is None else latency)
+        self.service_ids.append(
+            self._intern(service, self.services, self.service_lookup)
+        )
+        self.families.append(family)
+        if message:
+            self.messages[row] = message
+        return row
+
+    def append(self, result):
+        # accepts the result dicts produced by PortScanner, returns the row
+        return self.add(
+            result.get("host", ""),
+            result["port"],
+            result["status"],
+            result.get("latency"),
+            result.get("service", "Unknown"),
+            result.get("message"),
+            result.get("family", 4),
+        )
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+
+    def __len__(self):
+        return len(self.ports)
+
+    def __getitem__(self, row):
+        # a result dict, built on demand
+        if row < 0:
+            row += len(self.ports)
+        latency = self.latencies[row]
+        return {
+            "host": self.host(row),
+            "port": self.ports[row],
+            "status": self.status(row).name,
+            "latency": None if math.isnan(latency) else latency,
+            "message": self.messages.get(row),
+            "service": self.service(row),
+            "family": self.families[row],
+        }
+
+    def __iter__(self):
+        for row in range(len(self.ports)):
+            yield self[row]
+
+    def host(self, row):
+        return self.hosts[self.host_ids[row]]
+
+    def port(self, row):
+        return self.ports[row]
+
+    def status(self, row):
+        return PortStatus(self.statuses[row])
+
+    def latency(self, row):
+        return self.latencies[row]
+
+    def service(self, row):
+        return self.services[self.service_ids[row]]
+
+    def family(self, row):
+        return self.families[row]
+
+    def label(self, row):
+        # host for display, hostnames scanned over IPv6 are marked as such
+        host = self.host(row)
+        if self.families[row] == 6 and ":" not in host:
+            return f"{host} (IPv6)"
+        return host
+
+    def set_service(self, row, service):
+        # fingerprinting found the real service after the row was added
+        self.service_ids[row] = self._intern(
+            service, self.services, self.service_lookup
+        )
+
+    def response_time(self, row):
+        return format_response_time(self.latencies[row], self.messages.get(row))
+
+    def count(self, status):
+        # array.count runs in C, no per-row Python objects
+        return self.statuses.count(status)
+
+    def rows_with_status(self, status):
+        # bytes.find scans the status column in C
+        column = self.statuses.tobytes()
+        marker = bytes([status])
+        row = column.find(marker)
+        while row != -1:
+            yield row
+            row = column.find(marker, row + 1)
+
+    def summary(self):
+        counts = {status.name: self.count(status) for status in PortStatus}
+        counts["TOTAL"] = len(self.ports)
+        return counts
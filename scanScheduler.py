@@ -0,0 +1,216 @@
+import ipaddress
+import random
+import re
+from components.commonPorts import top_ports
+from dnsResolver import default_resolver
+
+"""
+Multi-target sweep scheduling
+Expands CIDR blocks, host lists and port lists into (host, port) work items.
+Work is interleaved port-major, so consecutive probes go to different hosts
+and no single host is hammered with back-to-back connects.
+
+Targets can be IPv4 or IPv6. With dual_stack a hostname is scanned on its
+first IPv4 and first IPv6 address, both families interleaved in the same
+sweep, results tell them apart by their "family" (4 or 6).
+"""
+
+# IPv6 prefixes larger than this are sampled, never enumerated (a /64 has
+# 2**64 addresses): the lowest addresses, where manually configured hosts
+# and routers usually sit, plus a fixed pseudo-random spread of the rest
+IPV6_SAMPLE = 256
+
+
+def address_family(address):
+    # 6 for IPv6 literals, 4 otherwise
+    return 6 if ":" in address else 4
+
+
+def sample_ipv6(network, count):
+    # deterministic per prefix, so a resumed scan gets the same targets
+    low = min(count // 2, network.num_addresses - 1)
+    offsets = dict.fromkeys(range(1, low + 1))
+    rng = random.Random(str(network))
+    while len(offsets) < count:
+        offsets[rng.randrange(1, network.num_addresses)] = None
+    base = int(network.network_address)
+    return [str(ipaddress.IPv6Address(base + offset)) for offset in offsets]
+
+
+def parse_targets(spec, ipv6_sample=IPV6_SAMPLE):
+    # "10.0.0.0/30, example.com 192.168.1.5 2001:db8::/64" -> host strings
+    if isinstance(spec, str):
+        spec = re.split(r"[\s,;]+", spec)
+
+    targets = []
+    seen = set()
+    for item in spec:
+        item = item.strip().strip("[]")
+        if not item:
+            continue
+        try:
+            network = ipaddress.ip_network(item, strict=False)
+        except ValueError:
+            hosts = [item]
+        else:
+            # single addresses have no usable hosts() range
+            if network.num_addresses == 1:
+                hosts = [str(network.network_address)]
+            elif network.version == 6 and network.num_addresses > ipv6_sample:
+                hosts = sample_ipv6(network, ipv6_sample)
+            else:
+                hosts = [str(host) for host in network.hosts()]
+
+        for host in hosts:
+            if host not in seen:
+                seen.add(host)
+                targets.append(host)
+    return targets
+
+
+def parse_ports(spec):
+    # "22,80,8000-8010" -> [22, 80, 8000, ..., 8010]
+    # "top-100" -> the 100 most likely open ports, most likely first
+    if not isinstance(spec, str):
+        return [int(port) for port in spec]
+
+    ports = []
+    seen = set()
+    for item in re.split(r"[\s,;]+", spec):
+        if not item:
+            continue
+        if item.lower().startswith("top-"):
+            values = top_ports(int(item[4:]))
+        elif "-" in item:
+            start, end = item.split("-", 1)
+            values = range(int(start), int(end) + 1)
+        else:
+            values = [int(item)]
+        for port in values:
+            if not 1 <= port <= 65535:
+                raise ValueError(f"Port out of range: {port}")
+            if port not in seen:
+                seen.add(port)
+                ports.append(port)
+    return ports
+
+
+def is_ip_address(host):
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class ScanScheduler:
+    """Interleaved (host, port) work for one or many targets"""
+
+    def __init__(
+        self, targets, ports, resolver=None, dual_stack=False, happy_eyeballs=False
+    ):
+        if isinstance(targets, str):
+            targets = parse_targets(targets)
+        self.targets = list(targets)
+        self.ports = parse_ports(ports)
+        self.resolver = resolver
+        # scan hostnames on IPv4 and IPv6, IPv6 first with happy_eyeballs
+        # (RFC 8305 order), otherwise IPv4 first
+        self.dual_stack = dual_stack
+        self.happy_eyeballs = happy_eyeballs
+        # target -> tuple of addresses to scan, () if unresolvable
+        self.addresses = {}
+        self.unresolved = []  # targets dropped because they did not resolve
+        self.checkpoint = None  # resumed scans skip work it marks as done
+        self.skipped = 0
+
+    @property
+    def total(self):
+        # one endpoint per target until resolve() knows its addresses
+        endpoints = sum(
+            len(self.addresses[target]) if target in self.addresses else 1
+            for target in self.targets
+        )
+        return endpoints * len(self.ports) - self.skipped
+
+    def resume_from(self, checkpoint):
+        # frozen, so items marked during the scan do not shift the work
+        self.checkpoint = checkpoint.frozen()
+        self.skipped = self.checkpoint.done_count()
+
+    def resolve(self):
+        # every hostname is looked up once, all of them concurrently, before
+        # the first probe. Names that do not resolve are dropped from the
+        # work (see unresolved) instead of failing port by port
+        pending = [target for target in self.targets if target not in self.addresses]
+        if pending:
+            resolver = self.resolver or default_resolver()
+            for target, addresses in resolver.resolve_all(pending).items():
+                self.addresses[target] = self.pick(addresses)
+
+        failed = [target for target in self.targets if not self.addresses[target]]
+        if failed:
+            self.drop(failed)
+            self.unresolved.extend(failed)
+        return self.addresses
+
+    def pick(self, addresses):
+        # the addresses of one target that get scanned, in scan order
+        ipv4 = next((a for a in addresses if address_family(a) == 4), None)
+        ipv6 = next((a for a in addresses if address_family(a) == 6), None)
+        if not self.dual_stack:
+            # IPv6 only for names without an A record
+            return tuple(a for a in (ipv4 or ipv6,) if a)
+        picked = (ipv6, ipv4) if self.happy_eyeballs else (ipv4, ipv6)
+        return tuple(a for a in picked if a)
+
+    def drop(self, targets):
+        # removes whole targets from the work
+        dropped = set(targets)
+        if self.checkpoint:
+            # every family the checkpoint keeps bits for
+            self.forget(dropped, (4, 6)[: self.checkpoint.families])
+        self.targets = [target for target in self.targets if target not in dropped]
+
+    def forget(self, targets, families):
+        # finished work of removed targets no longer counts towards the total
+        self.skipped -= sum(
+            self.checkpoint.is_done(target, port, family)
+            for target in targets
+            for family in families
+            for port in self.ports
+        )
+
+    def retain(self, live_addresses):
+        # drop addresses, and targets left without any, that did not pass
+        # host discovery
+        for target in self.targets:
+            addresses = self.addresses[target]
+            dead = [address for address in addresses if address not in live_addresses]
+            if not dead:
+                continue
+            if self.checkpoint:
+                self.forget([target], [address_family(address) for address in dead])
+            self.addresses[target] = tuple(
+                address for address in addresses if address in live_addresses
+            )
+        self.targets = [target for target in self.targets if self.addresses[target]]
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        # yields (target, address, port), one item per address of a target
+        if len(self.addresses) < len(self.targets):
+            self.resolve()
+        checkpoint = self.checkpoint
+        endpoints = [
+            (target, address, address_family(address))
+            for target in self.targets
+            for address in self.addresses[target]
+        ]
+        for port in self.ports:
+            for target, address, family in endpoints:
+                if checkpoint and checkpoint.is_done(target, port, family):
+                    continue
+                yield target, address, port
@@ -0,0 +1,213 @@
+import os
+import struct
+import sys
+from array import array
+
+"""
+Service name registry, every (protocol, port) -> service name
+Built once from the IANA service name registry (service-names-port-numbers
+.csv) or an /etc/services style file, with the hand-picked display names of
+components.commonPorts on top, and stored in services.bin:
+
+  header     magic, page count, size of the names blob
+  directory  one uint16 per (protocol, port >> 8), the page holding those
+             256 ports, page 0 is all zeros and shared by empty ranges
+  pages      256 uint16 name indexes each, 0 = no registered service
+  names      UTF-8, newline separated, index 0 is "Unknown"
+
+The committed services.bin is built with --iana and --services /etc/services,
+the latter only filling ports the CSV lacks.
+
+Nothing is read until the first lookup, which loads the whole file (a few
+hundred KiB at most) into two arrays and one list of names. A lookup is two
+array reads and a list index, it returns the same str object every time.
+
+  python serviceRegistry.py --iana service-names-port-numbers.csv
+  python serviceRegistry.py --services /etc/services
+"""
+
+REGISTRY_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "services.bin"
+)
+
+MAGIC = b"PSVCREG1"
+HEADER = struct.Struct("<8sII")  # magic, page count, names blob size
+PROTOCOLS = ("tcp", "udp")
+PAGE_SIZE = 256
+UNKNOWN = "Unknown"
+
+_registry = None
+
+
+class ServiceRegistry:
+    """Two level (protocol, port) -> name table, see the module docstring"""
+
+    __slots__ = ("directory", "pages", "names")
+
+    def __init__(self, directory, pages, names):
+        self.directory = directory
+        self.pages = pages
+        self.names = names
+
+    @classmethod
+    def load(cls, path=REGISTRY_PATH):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, page_count, names_size = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a service registry")
+
+        offset = HEADER.size
+        directory = array("H")
+        directory.frombytes(data[offset : offset + len(PROTOCOLS) * 512])
+        offset += len(PROTOCOLS) * 512
+        pages = array("H")
+        pages.frombytes(data[offset : offset + page_count * PAGE_SIZE * 2])
+        offset += page_count * PAGE_SIZE * 2
+        if sys.byteorder != "little":
+            directory.byteswap()
+            pages.byteswap()
+
+        names = [
+            sys.intern(name)
+            for name in data[offset : offset + names_size].decode("utf-8").split("\n")
+        ]
+        return cls(directory, pages, names)
+
+    @classmethod
+    def from_entries(cls, entries):
+        # entries: {(protocol, port): name}
+        names = [UNKNOWN]
+        name_ids = {UNKNOWN: 0}
+        directory = array("H", [0] * (len(PROTOCOLS) * 256))
+        pages = array("H", [0] * PAGE_SIZE)  # shared empty page
+        for (protocol, port), name in sorted(entries.items()):
+            slot = PROTOCOLS.index(protocol) * 256 + (port >> 8)
+            if not directory[slot]:
+                directory[slot] = len(pages) // PAGE_SIZE
+                pages.extend([0] * PAGE_SIZE)
+            if name not in name_ids:
+                name_ids[name] = len(names)
+                names.append(name)
+            pages[directory[slot] * PAGE_SIZE + (port & 0xFF)] = name_ids[name]
+        return cls(directory, pages, names)
+
+    def save(self, path=REGISTRY_PATH):
+        directory = array("H", self.directory)
+        pages = array("H", self.pages)
+        if sys.byteorder != "little":
+            directory.byteswap()
+            pages.byteswap()
+        names = "\n".join(self.names).encode("utf-8")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(pages) // PAGE_SIZE, len(names)))
+            f.write(directory.tobytes())
+            f.write(pages.tobytes())
+            f.write(names)
+
+    def lookup(self, port, protocol="tcp"):
+        base = 0 if protocol == "tcp" else 256
+        page = self.directory[base + (port >> 8)]
+        return self.names[self.pages[page * PAGE_SIZE + (port & 0xFF)]]
+
+    def __len__(self):
+        # registered (protocol, port) pairs
+        return sum(1 for index in self.pages if index)
+
+
+def registry():
+    # loaded on first use, an empty registry if the data file is missing
+    global _registry
+    if _registry is None:
+        try:
+            _registry = ServiceRegistry.load()
+        except (OSError, ValueError) as e:
+            print(f"Service registry unavailable: {e}", file=sys.stderr)
+            _registry = ServiceRegistry.from_entries({})
+    return _registry
+
+
+def service_name(port, protocol="tcp"):
+    return registry().lookup(port, protocol)
+
+
+# building
+
+
+def read_iana_csv(path):
+    # IANA service-names-port-numbers.csv, port numbers may be ranges
+    import csv
+
+    entries = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            name = row["Service Name"].strip()
+            protocol = row["Transport Protocol"].strip().lower()
+            ports = row["Port Number"].strip()
+            if not name or not ports or protocol not in PROTOCOLS:
+                continue
+            first, _, last = ports.partition("-")
+            for port in range(int(first), int(last or first) + 1):
+                entries.setdefault((protocol, port), name)
+    return entries
+
+
+def read_services_file(path):
+    # /etc/services: "name  port/protocol  aliases  # comment"
+    entries = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.split("#", 1)[0].split()
+            if len(fields) < 2 or "/" not in fields[1]:
+                continue
+            port, _, protocol = fields[1].partition("/")
+            if protocol in PROTOCOLS and port.isdigit():
+                entries.setdefault((protocol, int(port)), fields[0])
+    return entries
+
+
+def build(entries):
+    # registry keywords are lowercase ("tcpmux"), show them upper case like the
+    # display names, hand-picked names win, for UDP only where the port is
+    # registered for UDP
+    from components.commonPorts import COMMON_PORTS
+
+    entries = {key: name.upper() for key, name in entries.items()}
+    for port, name in COMMON_PORTS.items():
+        entries[("tcp", port)] = name
+        if ("udp", port) in entries:
+            entries[("udp", port)] = name
+    return ServiceRegistry.from_entries(entries)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build data/services.bin")
+    parser.add_argument("--iana", help="IANA service-names-port-numbers.csv")
+    parser.add_argument(
+        "--services", help="/etc/services style file, used for ports the CSV lacks"
+    )
+    parser.add_argument("-o", "--output", default=REGISTRY_PATH)
+    args = parser.parse_args()
+    if not args.iana and not args.services:
+        parser.error("give --iana and/or --services")
+
+    entries = {}
+    if args.iana:
+        entries.update(read_iana_csv(args.iana))
+    if args.services:
+        for key, name in read_services_file(args.services).items():
+            entries.setdefault(key, name)
+    table = build(entries)
+    table.save(args.output)
+    print(
+        f"{args.output}: {len(table)} ports, {len(table.names)} names, "
+        f"{os.path.getsize(args.output)} bytes"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,48 +11,48 @@ class Styles:
 
     OPEN = "#6ce5e8"
     CLOSED = "#2c3e50"
+    FILTERED = "#7f8c8d"
 
     TEXT_COLOR = "#ffffff"
     DARK_TEXT = "#000000"
 
     BORDER_SIZE = "1px"
-    MAIN_WINDOW = """
-        QMainWindow {
+
+    # every piece is scoped by widget type, object name or a "variant" /
+    # "panel" property, so they combine into one application stylesheet
+    # (APPLICATION) that is set once instead of per widget
+    MAIN_WINDOW = f"""
+        QMainWindow {{
             background-color: {DARK_BG};
             font-family: Arial;
             font-size: 12px;
             color: #ffffff;
-        }
+        }}
     """
 
     MAIN_WIDGET = f"""
-        QWidget#central_widget {{
-            font-family: Arial;
-            color: {TEXT_COLOR};
-            margin: 5px;
-        }}
         QWidget {{
             background-color: {DARK_BG};
             font-family: Arial;
             color: {TEXT_COLOR};
         }}
+        QWidget#central_widget {{
+            margin: 5px;
+        }}
     """
 
+    # containers with panel="sidebar", plus the plain widgets inside them
     SIDEBAR_BACKGROUND = f"""
-        QWidget {{
+        QWidget[panel="sidebar"],
+        QWidget[panel="sidebar"] .QWidget,
+        QWidget[panel="sidebar"] QLabel,
+        QWidget[panel="sidebar"] QCheckBox {{
             background-color: {LIGHT_BG};
         }}
-        QWidget#border {{
-            background-color: {LIGHT_BG};
-            border-left: {BORDER_SIZE} solid {BORDER_COLOR};
-            border-right: {BORDER_SIZE} solid {BORDER_COLOR};
-            border-bottom: {BORDER_SIZE} solid {BORDER_COLOR};
-            border-top: none;
-        }}
     """
 
     HEADER_LABEL = f"""
-        QLabel {{
+        QLabel#header {{
             font-size: 18px;
             font-weight: bold;
             color: {TEXT_COLOR};
@@ -78,6 +78,21 @@ class Styles:
         }}
     """
 
+    COMBOBOX = f"""
+        QComboBox {{
+            background-color: {INPUT_DARK};
+            border: 1px solid {INPUT_LIGHT};
+            color: {TEXT_COLOR};
+            border-radius: 8px;
+            padding: 5px;
+            font-size: 14px;
+        }}
+        QComboBox QAbstractItemView {{
+            background-color: {INPUT_DARK};
+            color: {TEXT_COLOR};
+        }}
+    """
+
     TEXT_BOX = """
         QTextBrowser {
             padding: 5px;
@@ -99,6 +114,12 @@ class Styles:
             min-width: 80px;
             min-height: 20px;
         }}
+        QSpinBox QLineEdit, QDoubleSpinBox QLineEdit {{
+            background-color: {INPUT_DARK};
+            border: none;
+            border-radius: 0px;
+            padding: 0px;
+        }}
         QSpinBox::up-button, QDoubleSpinBox::up-button {{
             width: 16px;
             border-left: 1px solid {INPUT_LIGHT};
@@ -125,7 +146,7 @@ class Styles:
     """
 
     SIDEBAR_LABEL = """
-        QLabel {
+        QLabel[variant="sidebar"] {
             color: black;
             font-size: 15px;
             font-weight: bold;
@@ -134,8 +155,8 @@ class Styles:
     """
 
     LABEL = f"""
-        QLabel {{
-            color: {TEXT_COLOR}
+        QLabel[variant="light"] {{
+            color: {TEXT_COLOR};
             font-size: 15px;
             font-weight: bold;
             margin: 5px 0px 2px 0px;
@@ -164,3 +185,20 @@ class Styles:
             background-color: #4a4a4a;
         }}
     """
+
+    APPLICATION = "".join(
+        [
+            MAIN_WINDOW,
+            MAIN_WIDGET,
+            SIDEBAR_BACKGROUND,
+            HEADER_LABEL,
+            INPUT_FIELD,
+            COMBOBOX,
+            TEXT_BOX,
+            SPINBOX_FIELD,
+            SIDEBAR_LABEL,
+            LABEL,
+            CHECKBOX,
+            BUTTON,
+        ]
+    )
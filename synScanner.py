@@ -0,0 +1,272 @@
+import os
+import queue
+import random
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+from scanScheduler import address_family
+
+"""
+TCP SYN (half-open) scanning, similar to Nmap -sS
+Crafted SYNs go out on one raw socket, a receiver thread matches the
+SYN-ACK / RST replies. The handshake is never completed, so a probe costs
+no socket or file descriptor of its own.
+
+Linux only, needs root or CAP_NET_RAW.
+"""
+
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+# ICMP destination unreachable codes that mean "filtered"
+ICMP_UNREACHABLE = 3
+ICMP_FILTER_CODES = {1, 2, 3, 9, 10, 13}
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_syn(source_ip, dest_ip, source_port, dest_port, seq):
+    # 20 byte TCP header, no options
+    header = struct.pack(
+        "!HHLLBBHHH", source_port, dest_port, seq, 0, 5 << 4, TCP_SYN, 1024, 0, 0
+    )
+    pseudo = struct.pack(
+        "!4s4sBBH",
+        socket.inet_aton(source_ip),
+        socket.inet_aton(dest_ip),
+        0,
+        socket.IPPROTO_TCP,
+        len(header),
+    )
+    return header[:16] + struct.pack("!H", checksum(pseudo + header)) + header[18:]
+
+
+def local_address_for(dest_ip):
+    # let the routing table pick the source address, nothing is sent
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        probe.connect((dest_ip, 9))
+        return probe.getsockname()[0]
+    finally:
+        probe.close()
+
+
+class SynScanner:
+    """Raw socket SYN scan engine used by PortScanner(engine="syn")"""
+
+    def __init__(self, scanner, retries=1):
+        if not sys.platform.startswith("linux"):
+            raise OSError("SYN scanning is only supported on Linux")
+        self.scanner = scanner
+        self.window = scanner.concurrency  # probes in flight
+        self.retries = retries
+        self.secret = os.urandom(8)
+        self.source_port = random.randint(40000, 60999)
+        self.source_ips = {}
+
+        try:
+            self.sender = socket.socket(
+                socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP
+            )
+            self.receiver = socket.socket(
+                socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP
+            )
+            self.icmp = socket.socket(
+                socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP
+            )
+        except PermissionError as e:
+            raise PermissionError("SYN scanning needs root or CAP_NET_RAW") from e
+        self.receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+
+        self.replies = queue.Queue()
+        self.running = threading.Event()
+
+    def cookie(self, address, port):
+        # sequence number derived from the destination, replies must ack it + 1
+        data = socket.inet_aton(address) + struct.pack("!H", port) + self.secret
+        return zlib.crc32(data) & 0xFFFFFFFF
+
+    def send_probe(self, address, port):
+        self.scanner.pace(address)
+        source_ip = self.source_ips.get(address)
+        if source_ip is None:
+            source_ip = self.source_ips[address] = local_address_for(address)
+        packet = build_syn(
+            source_ip, address, self.source_port, port, self.cookie(address, port)
+        )
+        self.sender.sendto(packet, (address, 0))
+
+    def receive_loop(self):
+        # runs on its own thread, only parses and queues matching replies
+        sockets = [self.receiver, self.icmp]
+        while self.running.is_set():
+            readable, _, _ = select.select(sockets, [], [], 0.1)
+            for sock in readable:
+                try:
+                    packet = sock.recv(65535)
+                except OSError:
+                    continue
+                if sock is self.receiver:
+                    self.parse_tcp(packet)
+                else:
+                    self.parse_icmp(packet)
+
+    def parse_tcp(self, packet):
+        # anything short or malformed is dropped, an exception here would end
+        # the receiver thread and leave every probe to time out
+        if len(packet) < 20:
+            return
+        ihl = (packet[0] & 0x0F) * 4
+        if len(packet) < ihl + 20:
+            return
+        source = socket.inet_ntoa(packet[12:16])
+        sport, dport, _, ack, _, flags = struct.unpack(
+            "!HHLLBB", packet[ihl : ihl + 14]
+        )
+        if dport != self.source_port or not flags & TCP_ACK:
+            return
+        if ack != (self.cookie(source, sport) + 1) & 0xFFFFFFFF:
+            return
+        if flags & TCP_RST:
+            self.replies.put((source, sport, "CLOSED", time.monotonic()))
+        elif flags & TCP_SYN:
+            self.replies.put((source, sport, "OPEN", time.monotonic()))
+
+    def parse_icmp(self, packet):
+        if len(packet) < 20:
+            return
+        ihl = (packet[0] & 0x0F) * 4
+        if len(packet) < ihl + 8:
+            return
+        icmp_type, code = packet[ihl], packet[ihl + 1]
+        if icmp_type != ICMP_UNREACHABLE or code not in ICMP_FILTER_CODES:
+            return
+        # the unreachable message quotes our original IP + TCP header
+        inner = packet[ihl + 8 :]
+        if len(inner) < 20:
+            return
+        inner_ihl = (inner[0] & 0x0F) * 4
+        if inner_ihl < 20 or len(inner) < inner_ihl + 4:
+            return
+        if inner[9] != socket.IPPROTO_TCP:
+            return
+        dest = socket.inet_ntoa(inner[16:20])
+        sport, dport = struct.unpack("!HH", inner[inner_ihl : inner_ihl + 4])
+        if sport == self.source_port:
+            self.replies.put((dest, dport, "FILTERED", time.monotonic()))
+
+    def scan(self, work, callback):
+        scanner = self.scanner
+        work = iter(work)
+        # (address, port) -> [hosts, sent_at, tries], one probe answers every
+        # work item that resolved to the same address ("localhost" and
+        # "127.0.0.1"), hosts holds one entry per item
+        pending = {}
+        waiting = 0  # work items in pending
+        exhausted = False
+
+        self.running.set()
+        receiver = threading.Thread(target=self.receive_loop, daemon=True)
+        receiver.start()
+        try:
+            while scanner.is_scanning and (pending or not exhausted):
+                # keep the send window full
+                while not exhausted and waiting < self.window:
+                    item = next(work, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    host, address, port = item
+                    if address is None:
+                        scanner._record(
+                            scanner.error_result(host, port, "hostname error"),
+                            callback,
+                        )
+                        continue
+                    if address_family(address) == 6:
+                        # raw IPv4 packets only, use a connect engine for IPv6
+                        scanner._record(
+                            scanner.error_result(
+                                host, port, "IPv6 not supported by the SYN engine", 6
+                            ),
+                            callback,
+                        )
+                        continue
+                    entry = pending.get((address, port))
+                    if entry is None:
+                        try:
+                            self.send_probe(address, port)
+                        except OSError as e:
+                            result = scanner.error_result(host, port, str(e))
+                            scanner._record(result, callback)
+                            continue
+                        entry = pending[(address, port)] = [[], time.monotonic(), 1]
+                    entry[0].append(host)
+                    waiting += 1
+
+                scanner.metrics.in_flight = waiting
+
+                # match replies
+                try:
+                    reply = self.replies.get(timeout=0.01)
+                except queue.Empty:
+                    reply = None
+                while reply is not None:
+                    address, port, status, received_at = reply
+                    entry = pending.pop((address, port), None)
+                    if entry is not None:
+                        hosts, sent_at, tries = entry
+                        waiting -= len(hosts)
+                        if scanner.timing and status != "FILTERED":
+                            scanner.timing.record(
+                                address, received_at - sent_at, retransmitted=tries > 1
+                            )
+                        for host in hosts:
+                            result = scanner.make_result(
+                                host, port, status, (received_at - sent_at) * 1000
+                            )
+                            scanner._record(result, callback)
+                    try:
+                        reply = self.replies.get_nowait()
+                    except queue.Empty:
+                        reply = None
+
+                # silence past the timeout, retransmit or call it filtered
+                now = time.monotonic()
+                for key, entry in list(pending.items()):
+                    hosts, sent_at, tries = entry
+                    if now - sent_at < scanner.probe_timeout(key[0]):
+                        continue
+                    if tries <= self.retries:
+                        try:
+                            self.send_probe(*key)
+                        except OSError:
+                            pass
+                        entry[1] = now
+                        entry[2] = tries + 1
+                        continue
+                    del pending[key]
+                    waiting -= len(hosts)
+                    for host in hosts:
+                        result = scanner.make_result(host, key[1], "FILTERED")
+                        scanner._record(result, callback)
+        finally:
+            self.running.clear()
+            receiver.join()
+            self.close()
+
+    def close(self):
+        for sock in (self.sender, self.receiver, self.icmp):
+            sock.close()
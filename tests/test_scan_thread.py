@@ -0,0 +1,52 @@
+import socket
+import pytest
+
+QtCore = pytest.importorskip("PySide6.QtCore")
+
+import scanHistory  # noqa: E402
+from main import ScanThread  # noqa: E402
+
+
+def run_scan(ports):
+    # runs one ScanThread to completion, returns every results_ready payload
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    thread = ScanThread(["127.0.0.1"], ports, engine="async", checkpoint_path=None)
+    received = []
+    thread.results_ready.connect(
+        lambda results, changes: received.append((results, changes))
+    )
+    loop = QtCore.QEventLoop()
+    thread.finished.connect(loop.quit)
+    thread.start()
+    loop.exec()
+    thread.wait()
+    app.processEvents()
+    return received
+
+
+def test_changes_cross_threads(tmp_path, monkeypatch):
+    # the changes dict is built on the flusher thread and queued to the
+    # GUI thread, its (host, port, family) keys must survive the trip
+    monkeypatch.setattr(
+        scanHistory, "DEFAULT_HISTORY", str(tmp_path / "history.sqlite")
+    )
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+
+    try:
+        received = run_scan([port])
+    finally:
+        listener.close()
+    changes = {}
+    for _, batch in received:
+        changes.update(batch)
+    assert changes == {("127.0.0.1", port, 4): None}
+
+    # the port is closed now, the next scan reports OPEN -> CLOSED
+    received = run_scan([port])
+    changes = {}
+    for _, batch in received:
+        changes.update(batch)
+    assert changes == {("127.0.0.1", port, 4): "OPEN"}
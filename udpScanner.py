@@ -0,0 +1,244 @@
+import errno
+import selectors
+import socket
+import struct
+import sys
+import time
+from scanScheduler import address_family
+
+"""
+UDP scanning, similar to Nmap -sU
+Each probe is a connected UDP socket carrying a protocol specific payload
+(an empty datagram gets ignored by most services). On Linux IP_RECVERR
+surfaces ICMP port unreachable as ECONNREFUSED right away, so closed ports
+are classified without waiting out the timeout. Ports that never answer
+are reported as FILTERED (open|filtered). IPv6 targets work the same way
+with IPV6_RECVERR.
+"""
+
+# not exported by the socket module, values from <linux/in.h>, <linux/in6.h>
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+IPV6_RECVERR = getattr(socket, "IPV6_RECVERR", 25)
+
+# hosts rate limit ICMP unreachables (Linux ~1/s per destination with a
+# small burst), probing faster than that only produces false open|filtered.
+# Like Nmap, every host starts fast and its probe interval doubles whenever a
+# probe times out on a host that has answered with port unreachables before,
+# down to MIN_HOST_RATE. Hosts that never send unreachables stay fast
+DEFAULT_HOST_RATE = 50  # probes per second per host, to start with
+MIN_HOST_RATE = 1
+
+UNREACHABLE_ERRNOS = {errno.EHOSTUNREACH, errno.ENETUNREACH, errno.EACCES}
+
+
+def dns_query():
+    # standard query for the root NS records
+    header = struct.pack("!HHHHHH", 0x1337, 0x0100, 1, 0, 0, 0)
+    return header + b"\x00" + struct.pack("!HH", 2, 1)
+
+
+def ntp_query():
+    # version 4, client mode
+    return b"\x23" + b"\x00" * 47
+
+
+def snmp_query():
+    # SNMPv1 get-request, community "public", sysDescr.0
+    return bytes.fromhex(
+        "302602010004067075626c6963a019020400000001020100020100"
+        "300b300906052b060102010500"
+    )
+
+
+def netbios_query():
+    # NBSTAT query for "*"
+    name = b"\x20" + b"CKAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA" + b"\x00"
+    return struct.pack("!HHHHHH", 0x1337, 0, 1, 0, 0, 0) + name + b"\x00\x21\x00\x01"
+
+
+def ssdp_query():
+    return (
+        b"M-SEARCH * HTTP/1.1\r\n"
+        b"HOST: 239.255.255.250:1900\r\n"
+        b'MAN: "ssdp:discover"\r\n'
+        b"MX: 1\r\n"
+        b"ST: ssdp:all\r\n\r\n"
+    )
+
+
+def tftp_query():
+    # read request for a file that will not exist, any reply means open
+    return b"\x00\x01" + b"portscan" + b"\x00" + b"octet" + b"\x00"
+
+
+# payloads keyed by port, see serviceRegistry for the service names
+UDP_PAYLOADS = {
+    53: dns_query(),
+    69: tftp_query(),
+    123: ntp_query(),
+    137: netbios_query(),
+    161: snmp_query(),
+    1900: ssdp_query(),
+    5353: dns_query(),
+}
+
+
+class UdpScanner:
+    """UDP scan engine used by PortScanner(engine="udp")"""
+
+    def __init__(self, scanner, retries=1, host_rate=DEFAULT_HOST_RATE):
+        self.scanner = scanner
+        self.timeout = scanner.timeout
+        self.window = scanner.concurrency
+        self.retries = retries
+        self.host_interval = 1.0 / host_rate if host_rate else 0.0
+        self.max_interval = max(self.host_interval, 1.0 / MIN_HOST_RATE)
+        self.intervals = {}  # address -> backed off probe interval
+        self.answered = set()  # addresses that sent a port unreachable
+        self.next_send = {}  # address -> earliest time of the next probe
+        self.selector = selectors.DefaultSelector()
+
+    def open_probe(self, address, port):
+        self.scanner.pace(address)
+        ipv6 = address_family(address) == 6
+        sock = socket.socket(
+            socket.AF_INET6 if ipv6 else socket.AF_INET, socket.SOCK_DGRAM
+        )
+        sock.setblocking(False)
+        if sys.platform.startswith("linux"):
+            if ipv6:
+                sock.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVERR, 1)
+            else:
+                sock.setsockopt(socket.SOL_IP, IP_RECVERR, 1)
+        try:
+            sock.connect((address, port))
+            sock.send(UDP_PAYLOADS.get(port, b""))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def ready(self, address, now):
+        # per host pacing so ICMP rate limits do not eat the answers
+        return self.next_send.get(address, 0.0) <= now
+
+    def sent(self, address, now):
+        self.next_send[address] = now + self.intervals.get(
+            address, self.host_interval
+        )
+
+    def back_off(self, address):
+        # a probe went unanswered where unreachables used to come back,
+        # most likely the host's ICMP rate limit
+        if self.host_interval and address in self.answered:
+            interval = self.intervals.get(address, self.host_interval)
+            self.intervals[address] = min(self.max_interval, interval * 2)
+
+    def read_probe(self, sock):
+        # returns the status for a readable socket
+        try:
+            sock.recv(4096)
+            return "OPEN", None
+        except ConnectionRefusedError:
+            # ICMP port unreachable
+            return "CLOSED", None
+        except OSError as e:
+            if e.errno in UNREACHABLE_ERRNOS:
+                return "FILTERED", None
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return None, None
+            return "ERROR", str(e)
+
+    def scan(self, work, callback):
+        scanner = self.scanner
+        work = iter(work)
+        held = None  # next item, waiting for its host's pacing slot
+        exhausted = False
+        # sock -> [host, address, port, sent_at, tries, timed out]
+        pending = {}
+
+        def finish(sock, status, message=None, latency=None):
+            host, address, port = pending.pop(sock)[:3]
+            self.selector.unregister(sock)
+            sock.close()
+            result = scanner.make_result(
+                host, port, status, latency, message, address_family(address)
+            )
+            scanner._record(result, callback)
+
+        try:
+            while scanner.is_scanning and (pending or held or not exhausted):
+                now = time.monotonic()
+                while len(pending) < self.window:
+                    if held is None:
+                        held = next(work, None)
+                        if held is None:
+                            exhausted = True
+                            break
+                    host, address, port = held
+                    if address is None:
+                        scanner._record(
+                            scanner.error_result(host, port, "hostname error"),
+                            callback,
+                        )
+                        held = None
+                        continue
+                    if not self.ready(address, now):
+                        break
+                    held = None
+                    self.sent(address, now)
+                    try:
+                        sock = self.open_probe(address, port)
+                    except OSError as e:
+                        result = scanner.error_result(
+                            host, port, str(e), address_family(address)
+                        )
+                        scanner._record(result, callback)
+                        continue
+                    pending[sock] = [host, address, port, now, 1, False]
+                    self.selector.register(sock, selectors.EVENT_READ)
+
+                scanner.metrics.in_flight = len(pending)
+                if pending:
+                    events = self.selector.select(timeout=0.01)
+                else:
+                    events = []
+                    time.sleep(0.001)
+
+                now = time.monotonic()
+                for key, _ in events:
+                    sock = key.fileobj
+                    status, message = self.read_probe(sock)
+                    if status is not None:
+                        if status == "CLOSED":
+                            self.answered.add(pending[sock][1])
+                        sent_at = pending[sock][3]
+                        finish(sock, status, message, (now - sent_at) * 1000)
+
+                # unanswered: resend the payload, then call it open|filtered
+                for sock, entry in list(pending.items()):
+                    if now - entry[3] < self.timeout:
+                        continue
+                    if entry[4] <= self.retries:
+                        if not entry[5]:
+                            entry[5] = True
+                            self.back_off(entry[1])
+                        # resends wait for the host's (backed off) slot too
+                        if not self.ready(entry[1], now):
+                            continue
+                        entry[5] = False
+                        self.sent(entry[1], now)
+                        self.scanner.pace(entry[1])
+                        try:
+                            sock.send(UDP_PAYLOADS.get(entry[2], b""))
+                        except OSError:
+                            pass
+                        entry[3] = now
+                        entry[4] += 1
+                        continue
+                    finish(sock, "FILTERED", "open|filtered")
+        finally:
+            for sock in list(pending):
+                self.selector.unregister(sock)
+                sock.close()
+            self.selector.close()